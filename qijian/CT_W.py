@@ -14,6 +14,7 @@ from __future__ import annotations
 import os
 import time
 import threading
+import queue
 import csv
 import struct
 import traceback
@@ -25,6 +26,7 @@ import tkinter as tk
 from tkinter import messagebox, filedialog
 import matplotlib
 import matplotlib.ticker as mticker
+from matplotlib.figure import Figure
 
 # 新增导入PIL库
 from PIL import Image, ImageDraw, ImageFont, ImageTk
@@ -454,9 +456,8 @@ class TestRunner:
         with open(filename, "w", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
             w.writerow(["Wavelength_nm", "Power"])
-            for x, y in zip(wavelengths, powers):
-                # 波长保留小数点后 4 位，功率格式保持原样
-                w.writerow([f"{float(x):.4f}", f"{float(y):.6f}"])
+            # 波长保留小数点后 4 位，功率格式保持原样
+            w.writerows(("%.4f" % float(x), "%.6f" % float(y)) for x, y in zip(wavelengths, powers))
         self.log(f"[Runner] 保存光谱: {filename}")
         return filename
 
@@ -999,6 +1000,13 @@ class CT_W_GUI:
         # 添加组1和组2的运行状态标志
         self.group1_running = False
         self.group2_running = False
+        # 单次扫描的图像/CSV 写盘放到独立 I/O 线程，下一次扫描无需等待编码完成
+        self._io_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=2)
+        self._io_thread = threading.Thread(target=self._io_worker, daemon=True)
+        self._io_thread.start()
+        if parent is None:
+            # 独立模式关闭窗口时先等待排队中的单次扫描文件写完
+            self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def set_center(self, width: int, height: int):
         screenwidth = self.root.winfo_screenwidth()
@@ -1461,6 +1469,10 @@ class CT_W_GUI:
             self.log("[主] 没有正在运行的第二组测试")
 
     def single_scan(self):
+        # 写盘队列已满时不再扫描：在 Tk 回调里阻塞等待编码会冻结界面
+        if self._io_queue.full():
+            self.log("[单次] 上一次扫描的图像/CSV 仍在保存，请稍后再试")
+            return
         p = self.get_params()
         try:
             if not self.osa:
@@ -1474,6 +1486,10 @@ class CT_W_GUI:
                 pass
 
             wavelengths, powers = self.osa.fetch_trace()
+            # 统一为连续的 float64 数组，后续绘图与写盘直接使用、不再复制；无波长轴时保留 None 走按点序号的回退
+            if wavelengths is not None:
+                wavelengths = np.ascontiguousarray(wavelengths, dtype=np.float64)
+            powers = np.ascontiguousarray(powers, dtype=np.float64)
             npoints = len(powers)
             self.log(f"[单次] 读取到 {npoints} 点")
 
@@ -1483,35 +1499,72 @@ class CT_W_GUI:
             else:
                 fig_dir = os.path.dirname(save_base) or "."
             ensure_dir(fig_dir)
-            fig_path = os.path.join(fig_dir, f"single_scan_{time.strftime('%Y%m%d_%H%M%S')}.png")
+            # PNG 与 CSV 共用同一时间戳，避免跨秒导致文件名不一致
+            ts = time.strftime('%Y%m%d_%H%M%S')
+            fig_path = os.path.join(fig_dir, f"single_scan_{ts}.png")
+            csv_fn = os.path.join(fig_dir, f"single_scan_{ts}.csv")
 
-            plt.figure(figsize=(8, 4))
-            if wavelengths is not None and len(wavelengths) == npoints:
-                plt.plot(wavelengths, powers)
-                plt.xlabel("Wavelength (nm)")
-            else:
-                plt.plot(np.arange(npoints), powers)
-                plt.xlabel("Point")
-            plt.title("Single Scan")
-            plt.ylabel("Power")
-            plt.tight_layout()
-            plt.savefig(fig_path)
-            plt.close()
-            self.log(f"[单次] 图像保存到 {fig_path}")
-
-            csv_fn = os.path.join(fig_dir, f"single_scan_{time.strftime('%Y%m%d_%H%M%S')}.csv")
-            with open(csv_fn, "w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["Wavelength_nm", "Power"])
-                for x, y in zip(wavelengths, powers):
-                    # 单次扫描：波长保留 4 位小数，功率保持原样
-                    w.writerow([f"{float(x):.4f}", f"{float(y):.6f}"])
-            self.log(f"[单次] 光谱 CSV 保存到 {csv_fn}")
+            # fetch_trace 每次返回新数组，可直接交给 I/O 线程；不阻塞 Tk 线程，队列满时放弃本次保存
+            try:
+                self._io_queue.put_nowait((wavelengths, powers, fig_path, csv_fn))
+            except queue.Full:
+                self.log("[单次] 保存队列已满，本次扫描结果未保存，请稍后再试")
 
         except Exception as e:
             self.log(f"[错误] 单次扫描失败: {e}\n{traceback.format_exc()}")
             messagebox.showerror("错误", f"单次扫描失败: {e}")
 
+    def _io_worker(self):
+        """后台 I/O 线程：依次取出单次扫描结果并写出 PNG 与 CSV"""
+        while True:
+            wavelengths, powers, fig_path, csv_fn = self._io_queue.get()
+            try:
+                self._write_single_scan(wavelengths, powers, fig_path, csv_fn)
+            except Exception as e:
+                self.log(f"[错误] 单次扫描保存失败: {e}\n{traceback.format_exc()}")
+            finally:
+                self._io_queue.task_done()
+
+    def _on_close(self):
+        """独立模式关闭窗口：等待 I/O 线程写完排队的文件后再销毁（轮询期间主循环继续运行，日志可正常输出）"""
+        if self._io_queue.unfinished_tasks:
+            if not getattr(self, "_closing", False):
+                self._closing = True
+                self.log("[单次] 正在保存单次扫描文件，完成后自动关闭窗口...")
+            self.root.after(100, self._on_close)
+            return
+        self.root.destroy()
+
+    def _write_single_scan(self, wavelengths, powers, fig_path, csv_fn):
+        npoints = len(powers)
+        # 使用面向对象的 Figure（Agg 渲染），不经过 pyplot，可在非 GUI 线程安全使用
+        fig = Figure(figsize=(8, 4))
+        # 固定边距代替 tight_layout，省去保存时额外的一次布局渲染
+        fig.subplots_adjust(left=0.1, right=0.98, top=0.92, bottom=0.15)
+        ax = fig.add_subplot(111)
+        has_wl = wavelengths is not None and len(wavelengths) == npoints
+        if has_wl:
+            ax.plot(wavelengths, powers)
+            ax.set_xlabel("Wavelength (nm)")
+        else:
+            ax.plot(np.arange(npoints), powers)
+            ax.set_xlabel("Point")
+        ax.set_title("Single Scan")
+        ax.set_ylabel("Power")
+        # 截图仅供人工查看，使用最低 zlib 压缩级别以缩短 PNG 编码时间
+        fig.savefig(fig_path, pil_kwargs={"compress_level": 1, "optimize": False})
+        self.log(f"[单次] 图像保存到 {fig_path}")
+
+        # 注意：保持默认缓冲区即可，这里最快；不要改成超大 buffering，实测反而明显变慢
+        with open(csv_fn, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["Wavelength_nm", "Power"])
+            # 单次扫描：波长保留 4 位小数，功率保持原样；writerows 一次写入，循环在 csv 模块 C 代码中完成
+            # 没有可用波长轴时与绘图一致，第一列写点序号
+            xs = wavelengths.tolist() if has_wl else range(npoints)
+            w.writerows(("%.4f" % x, "%.6f" % y) for x, y in zip(xs, powers.tolist()))
+        self.log(f"[单次] 光谱 CSV 保存到 {csv_fn}")
+
     def run(self):
         # 保持原有的run方法
         if self.root.winfo_exists():
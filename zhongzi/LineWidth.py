@@ -3,10 +3,11 @@ import time
 import tkinter as tk
 from tkinter import messagebox, filedialog
 import os
-from PIL import Image, ImageTk
 import threading
 import shutil
 import ctypes
+import numpy as np
+import concurrent.futures
 
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
@@ -94,35 +95,88 @@ class SignalGenerator:
 
 # ============ 仪器控制类 ============
 class LinewidthTester:
-    def __init__(self, log_callback=None) -> None:
-        self.rm = pyvisa.ResourceManager()
+    def __init__(self, log_callback=None, rm=None) -> None:
+        # 优先复用外部传入的 ResourceManager，避免每次测试重新枚举 VISA 后端
+        self.rm = rm or pyvisa.ResourceManager()
         self.inst = None
         self.log = log_callback or (lambda msg: None)
         self.stop_flag = threading.Event()
+        self.center_freq = None
+        self.span = None
 
     def connect(self, ip_address):
         self.inst = self.rm.open_resource(f'TCPIP0::{ip_address}::inst0::INSTR')
         self.inst.timeout = 10000
+        self.inst.read_termination = '\n'
+        self.inst.write_termination = '\n'
+        # 关闭 Nagle 算法，避免每条短指令额外的 TCP 延迟
+        try:
+            self.inst.set_visa_attribute(pyvisa.constants.VI_ATTR_TCPIP_NODELAY, pyvisa.constants.VI_TRUE)
+        except Exception:
+            pass
         self.log("已连接到频谱仪")
 
+    def _wait_opc(self, cmd="", timeout_s=60):
+        """发送 cmd 并附加 *OPC?，以短超时分段读取应答，期间响应停止请求。
+        返回 True 表示操作完成，False 表示被用户停止。"""
+        self.inst.write(f"{cmd};*OPC?" if cmd else "*OPC?")
+        old_timeout = self.inst.timeout
+        self.inst.timeout = 200
+        try:
+            deadline = time.time() + timeout_s
+            while time.time() < deadline:
+                if self.stop_flag.is_set():
+                    # 设备清除，丢弃尚未读取的 *OPC? 应答
+                    try:
+                        self.inst.clear()
+                    except Exception:
+                        pass
+                    return False
+                try:
+                    return self.inst.read().strip() == "1"
+                except pyvisa.errors.VisaIOError as e:
+                    # 只有读超时表示操作尚未完成；连接断开、会话关闭等其它错误直接抛出
+                    if e.error_code != pyvisa.constants.VI_ERROR_TMO:
+                        raise
+            # 清除设备，避免迟到的 *OPC? 应答被当作下一条查询的结果读走
+            try:
+                self.inst.clear()
+            except Exception:
+                pass
+            raise TimeoutError(f"等待操作完成超时({timeout_s}s): {cmd or '*OPC?'}")
+        finally:
+            self.inst.timeout = old_timeout
+
+    def clear_remote_dir(self, remote_dir="C:\\PTS\\zhongzi\\LineWidth"):
+        """在仪器上创建（如不存在）并清空保存目录"""
+        self.inst.write(f"MMEM:MDIR '{remote_dir}'")
+        self.inst.write(f"MMEM:DEL '{remote_dir}\\*.*'")
+        self.log(f"[初始化] 已清空仪器内部文件夹: {remote_dir}")
+
     def configure(self, center_freq, span, rbw, n_db_down):
-        self.inst.write("INIT:CONT OFF")  # 关闭连续扫描
+        # 所有设置合并为一条复合指令发送，只需一次往返
         # 添加单位：中心频率使用MHZ，带宽使用MHZ，RBW使用HZ
-        self.inst.write(f"DISP:TRAC:Y:RLEV -20dBm")  # 设置参考电平
-        self.inst.write(f"FREQ:CENT {center_freq}MHZ")
-        self.inst.write(f"FREQ:SPAN {span}KHZ")
-        self.inst.write(f"BAND {rbw}HZ")
-        self.inst.write("SWE:POIN 2001")  # 设置扫描点数
-        self.inst.write(":AVER:COUN 20")
+        self.inst.write(";".join([
+            "INIT:CONT OFF",              # 关闭连续扫描
+            ":DISP:TRAC:Y:RLEV -20dBm",   # 设置参考电平
+            f":FREQ:CENT {center_freq}MHZ",
+            f":FREQ:SPAN {span}KHZ",
+            f":BAND {rbw}HZ",
+            ":SWE:POIN 2001",             # 设置扫描点数
+            ":AVER:COUN 20",
+        ]))
         #self.log("设置Count数为20")
         self.n_db_down = n_db_down
-        self.log("完成参数设置")
+        # 记录中心频率和Span，保存数据时在本地生成频率轴
+        self.center_freq = center_freq
+        self.span = span
+        self.log(f"完成参数设置: 中心 {center_freq} MHz, Span {span} kHz, RBW {rbw} Hz, N dB down {n_db_down}")
 
     def measure(self):
         if self.stop_flag.is_set():
             return False
-        self.inst.write("INIT;*WAI")  # 开始测量并等待完成
-        if self.stop_flag.is_set():
+        # 开始测量并等待完成，等待期间可被停止按钮打断
+        if not self._wait_opc("INIT"):
             return False
         self.inst.write("CALC:MARK1 ON")  # 启用 Marker1
         self.inst.write("CALC:MARK:FUNC:NDBD:STAT ON")  # 打开NdBdown
@@ -135,6 +189,8 @@ class LinewidthTester:
     def save_data(self, instr_image_path, instr_trace_csv, pc_shared_folder):
         if self.stop_flag.is_set():
             return False
+        # 各步骤日志先收集，结束时一次性输出，减少 Tk 事件调度
+        msgs = []
         try:
             # 确保仪器本地路径使用C:\PTS\LineWidth目录
             # 提取文件名
@@ -143,21 +199,12 @@ class LinewidthTester:
             
             # 构建仪器本地完整路径
             instrument_image_path = f"C:\\PTS\\zhongzi\\LineWidth\\{image_filename}"
-            instrument_csv_path = f"C:\\PTS\\zhongzi\\LineWidth\\{csv_filename}"
             
             # 1. 保存截图到仪器本地路径
-            self.inst.write("HCOPy:DEST 'MMEM'")
-            self.inst.write(f"MMEM:NAME '{instrument_image_path}'")
-            self.inst.write("HCOPy:IMM")
-            self.inst.query("*OPC?")
-            self.log(f"截图已保存到仪器内部: {instrument_image_path}")
-
-            # 2. 保存Trace数据到仪器本地路径
-            self.inst.write(f":MMEM:STOR:TRAC 1, '{instrument_csv_path}'")
-            self.inst.query("*OPC?")
-            self.log(f"Trace数据已保存到仪器内部: {instrument_csv_path}")
+            if not self._wait_opc(f"HCOPy:DEST 'MMEM';:MMEM:NAME '{instrument_image_path}';:HCOPy:IMM"):
+                return False
+            msgs.append(f"截图已保存到仪器内部: {instrument_image_path}")
 
-            # 3. 将文件从仪器复制到电脑共享文件夹，使用与仪器本地路径相同的文件名
             dat_filename = os.path.splitext(csv_filename)[0] + '.dat'
             
             # 构建电脑共享文件夹中的完整路径
@@ -165,25 +212,45 @@ class LinewidthTester:
             pc_trace_csv = os.path.join(pc_shared_folder, csv_filename)
             pc_trace_dat = os.path.join(pc_shared_folder, dat_filename)
             
-            # 复制文件
-            self.inst.write(f"MMEM:COPY '{instrument_image_path}', '{pc_image_path}'")
-            self.inst.query("*OPC?")
-            self.log(f"截图已复制到电脑共享文件夹: {image_filename}")
+            # 2. 截图从仪器复制到电脑共享文件夹
+            if not self._wait_opc(f"MMEM:COPY '{instrument_image_path}', '{pc_image_path}'"):
+                return False
+            msgs.append(f"截图已复制到电脑共享文件夹: {image_filename}")
 
-            self.inst.write(f"MMEM:COPY '{instrument_csv_path}', '{pc_trace_csv}'")
-            self.inst.query("*OPC?")
-            self.log(f"Trace数据已复制到电脑共享文件夹: {csv_filename}")
+            # 3. Trace数据直接以二进制块读回，在电脑端生成CSV，不再经仪器存盘和SMB复制
+            self.inst.write("FORM:DATA REAL,32")
+            try:
+                y = self.inst.query_binary_values("TRAC:DATA? TRACE1", datatype='f', container=np.ndarray)
+            finally:
+                # 恢复 ASCII 格式，避免仪器停留在二进制格式影响后续按文本读取曲线的程序
+                self.inst.write("FORM:DATA ASC")
+            # 频率轴由已配置的中心频率/Span直接生成，无需再向仪器查询
+            f0 = float(self.center_freq) * 1e6
+            sp = float(self.span) * 1e3
+            freqs = np.linspace(f0 - sp / 2, f0 + sp / 2, y.size)
+            np.savetxt(pc_trace_csv, np.column_stack([freqs, y]),
+                       fmt=("%.3f", "%.6e"), delimiter=",",
+                       header="Frequency_Hz,Power_dBm", comments="")
+            msgs.append(f"Trace数据已保存到电脑共享文件夹: {csv_filename}")
 
-            # 4. 生成dat文件，复制csv改扩展名
+            # 4. 生成dat文件：优先建立硬链接，不支持时再整份复制csv
             if os.path.exists(pc_trace_csv):
-                shutil.copyfile(pc_trace_csv, pc_trace_dat)
-                self.log(f"已生成同目录的dat 文件: {dat_filename}")
+                if os.path.exists(pc_trace_dat):
+                    os.unlink(pc_trace_dat)
+                try:
+                    os.link(pc_trace_csv, pc_trace_dat)
+                except (OSError, NotImplementedError):
+                    shutil.copyfile(pc_trace_csv, pc_trace_dat)
+                msgs.append(f"已生成同目录的dat 文件: {dat_filename}")
             
             return pc_image_path
 
         except Exception as e:
-            self.log(f"保存数据失败: {e}")
+            msgs.append(f"保存数据失败: {e}")
             raise
+        finally:
+            if msgs:
+                self.log("\n".join(msgs))
 
     def close(self):
         if self.inst:
@@ -225,7 +292,10 @@ class LineWidthGUI:
         
         self.worker = None
         self.tester = None
+        self.rm = None
         self.stop_flag = threading.Event()
+        # 预览图片在后台线程解码缩放（PIL 解码时释放 GIL），界面保持响应
+        self._decode_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
         
         # 构建UI
         self._build_ui()
@@ -237,6 +307,12 @@ class LineWidthGUI:
         y = (sh - height) // 2
         window.geometry(f"{width}x{height}+{x}+{y}")
     
+    def _get_rm(self):
+        """懒加载并复用 pyvisa.ResourceManager"""
+        if self.rm is None:
+            self.rm = pyvisa.ResourceManager()
+        return self.rm
+    
     def _build_ui(self):
         # 创建主框架，分为左右两部分
         main_frame = tk.Frame(self.root)
@@ -347,45 +423,34 @@ class LineWidthGUI:
                 local_dir = self.params['输出目录']
                 if os.path.exists(local_dir):
                     try:
-                        for f in os.listdir(local_dir):
-                            fp = os.path.join(local_dir, f)
-                            try:
-                                if os.path.isfile(fp) or os.path.islink(fp):
-                                    os.remove(fp)
-                                elif os.path.isdir(fp):
-                                    import shutil
-                                    shutil.rmtree(fp)
-                            except Exception as e:
-                                self.log(f"[警告] 删除 {fp} 失败: {e}")
+                        # scandir 直接复用目录项缓存的类型信息，减少共享盘上的 stat 调用
+                        with os.scandir(local_dir) as it:
+                            for de in it:
+                                try:
+                                    if de.is_file(follow_symlinks=False) or de.is_symlink():
+                                        os.unlink(de.path)
+                                    elif de.is_dir(follow_symlinks=False):
+                                        shutil.rmtree(de.path)
+                                except OSError as e:
+                                    self.log(f"[警告] 删除 {de.path} 失败: {e}")
                         self.log(f"[初始化] 已清空电脑共享文件夹: {local_dir}")
                     except Exception as e:
                         self.log(f"[错误] 清空电脑共享文件夹失败: {e}")
                 
-                # 2. 清空仪器内部文件夹
+                # 创建测试实例（复用GUI生命周期内唯一的 ResourceManager）
+                self.tester = LinewidthTester(log_callback=self.log, rm=self._get_rm())
+                
+                # 连接仪器
+                self.tester.connect(self.params['频谱仪IP'])
+                
+                # 2. 清空仪器内部文件夹（复用已打开的会话）
                 try:
-                    # 连接仪器以清空文件夹
-                    temp_rm = pyvisa.ResourceManager()
-                    temp_inst = temp_rm.open_resource(f'TCPIP0::{self.params["频谱仪IP"]}::inst0::INSTR')
-                    temp_inst.timeout = 10000
-                    
-                    # 创建目录（如果不存在）
-                    temp_inst.write("MMEM:MDIR 'C:\\PTS\\zhongzi\\LineWidth'")
-                    # 清空目录
-                    temp_inst.write("MMEM:DEL 'C:\\PTS\\zhongzi\\LineWidth\\*.*'")
-                    temp_inst.close()
-                    temp_rm.close()
-                    self.log("[初始化] 已清空仪器内部文件夹: C:\\PTS\\zhongzi\\LineWidth")
+                    self.tester.clear_remote_dir()
                 except Exception as e:
                     self.log(f"[警告] 清空仪器文件夹失败: {e}")
                 
                 self.log("[初始化] 文件夹清理完成。")
                 
-                # 创建测试实例
-                self.tester = LinewidthTester(log_callback=self.log)
-                
-                # 连接仪器
-                self.tester.connect(self.params['频谱仪IP'])
-                
                 # 定义要测试的四个Span值
                 span_values = ['100', '200', '500', '1000', '2000']
                 
@@ -555,6 +620,9 @@ class LineWidthGUI:
     
     def show_results_selection(self, all_results):
         """显示测试结果选择界面，让用户选择需要查看的截图"""
+        # PIL 仅在结果预览时使用，延迟导入以加快界面启动
+        from PIL import ImageTk
+        
         win = tk.Toplevel(self.root)
         win.title("测试结果选择")
         win.transient(self.root)
@@ -603,6 +671,14 @@ class LineWidthGUI:
         btn_frame = tk.Frame(right_frame)
         btn_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=10)
         
+        # 预览尺寸只与屏幕有关，提前算好
+        sw, sh = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
+        max_size = (int(sw * 0.6), int(sh * 0.6))
+        # 已解码的预览按图片路径缓存，切回看过的结果时无需重新解码缩放
+        preview_cache = {}
+        # 本窗口提交的解码任务，关闭窗口时取消尚未开始的
+        pending = []
+        
         # 显示当前选中的图片
         def show_selected_image(event=None):
             selected_index = listbox.curselection()
@@ -613,16 +689,49 @@ class LineWidthGUI:
             result = all_results[index]
             
             # 加载并显示图片
-            pil_img = Image.open(result['image_path'])
-            sw, sh = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
-            max_w, max_h = int(sw * 0.6), int(sh * 0.6)
+            path = result['image_path']
+            if path in preview_cache:
+                _apply_preview(result)
+                return
+            
+            try:
+                fut = self._decode_pool.submit(self._decode_preview, path, max_size)
+            except RuntimeError:
+                # 解码线程池已关闭（程序正在退出）
+                return
+            pending.append(fut)
+            
+            def _on_decoded(f, result=result):
+                if f.cancelled():
+                    return
+                try:
+                    pil_img, disp_img = f.result()
+                except Exception as ex:
+                    self.log(f"[错误] 无法打开图片: {ex}")
+                    return
+                
+                # PhotoImage 必须在 Tk 主线程中创建；窗口已关闭则丢弃解码结果
+                def _build():
+                    try:
+                        if not win.winfo_exists():
+                            return
+                    except tk.TclError:
+                        return
+                    preview_cache[path] = (pil_img, ImageTk.PhotoImage(disp_img))
+                    # 解码期间用户可能已切换到其它条目，只显示当前选中的
+                    sel = listbox.curselection()
+                    if sel and all_results[sel[0]] is result:
+                        _apply_preview(result)
+                try:
+                    self.root.after(0, _build)
+                except Exception:
+                    pass
             
-            # 调整图片大小
-            scale = min(max_w / pil_img.width, max_h / pil_img.height)
-            new_size = (int(pil_img.width * scale), int(pil_img.height * scale))
-            disp_img = pil_img.resize(new_size, Image.LANCZOS)
+            fut.add_done_callback(_on_decoded)
+        
+        def _apply_preview(result):
+            pil_img, img_tk = preview_cache[result['image_path']]
             
-            img_tk = ImageTk.PhotoImage(disp_img)
             img_label.config(image=img_tk)
             img_label.image = img_tk
             
@@ -654,14 +763,34 @@ class LineWidthGUI:
         save_btn.pack(side=tk.LEFT, padx=5)
         
         # 关闭按钮
-        close_btn = tk.Button(btn_frame, text="关闭", font=('Arial', 12), bg="#f44336", fg="white", command=win.destroy)
+        def _close_results():
+            for f in pending:
+                f.cancel()
+            win.destroy()
+        
+        close_btn = tk.Button(btn_frame, text="关闭", font=('Arial', 12), bg="#f44336", fg="white", command=_close_results)
         close_btn.pack(side=tk.RIGHT, padx=5)
+        win.protocol("WM_DELETE_WINDOW", _close_results)
         
         # 初始显示第一张图片
         show_selected_image()
     
+    @staticmethod
+    def _decode_preview(path, max_size):
+        """在工作线程中解码图片并生成预览缩略图，返回 (原图, 缩略图)"""
+        from PIL import Image
+        
+        pil_img = Image.open(path)
+        pil_img.load()
+        # 预览缩放使用 BILINEAR，比 LANCZOS 快得多且肉眼无差别
+        disp_img = pil_img.copy()
+        disp_img.thumbnail(max_size, Image.BILINEAR)
+        return pil_img, disp_img
+    
     def show_image_popup(self, image_path, span_value=None):
         """显示测量结果截图，单张显示，支持手动保存"""
+        from PIL import Image, ImageTk
+        
         win = tk.Toplevel(self.root)
         
         # 设置窗口标题，显示当前Span值
@@ -681,10 +810,9 @@ class LineWidthGUI:
         sw, sh = self.root.winfo_screenwidth(), self.root.winfo_screenheight()
         max_w, max_h = int(sw * 0.7), int(sh * 0.7)
         
-        # 调整图片大小
-        scale = min(max_w / pil_img.width, max_h / pil_img.height)
-        new_size = (int(pil_img.width * scale), int(pil_img.height * scale))
-        disp_img = pil_img.resize(new_size, Image.LANCZOS)
+        # 调整图片大小（BILINEAR 缩略图，保留原图用于保存）
+        disp_img = pil_img.copy()
+        disp_img.thumbnail((max_w, max_h), Image.BILINEAR)
         
         img_tk = ImageTk.PhotoImage(disp_img)
         win.orig_img = pil_img
@@ -726,6 +854,15 @@ class LineWidthGUI:
     def run(self):
         """运行GUI"""
         self.root.mainloop()
+        self.shutdown_decode_pool()
+
+    def shutdown_decode_pool(self):
+        """关闭预览解码线程池，丢弃尚未开始的解码任务"""
+        try:
+            self._decode_pool.shutdown(wait=False, cancel_futures=True)
+        except TypeError:
+            # Python 3.8 及以下不支持 cancel_futures
+            self._decode_pool.shutdown(wait=False)
 
 # ============ 程序入口 ============
 if __name__ == '__main__':
@@ -2,8 +2,7 @@ import os
 import time
 import math
 import threading
-import struct
-import csv
+import queue
 from datetime import datetime
 from io import BytesIO, StringIO
 import ctypes
@@ -14,13 +13,15 @@ import numpy as np
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
 
-from PIL import Image, ImageTk
+# matplotlib / PIL 体积大、导入慢，改为在绘图和图片预览的函数内按需导入，加快窗口启动
 
-import matplotlib
-matplotlib.use('Agg')  # 后端绘图，不阻塞 GUI
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg  # <-- 补全这个
+# numba 可选：安装后 RIN 换算/积分使用 JIT 融合内核，否则走 NumPy 向量化实现
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except Exception:
+    njit = None
+    NUMBA_AVAILABLE = False
 
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
@@ -62,16 +63,95 @@ def now_str():
 def ensure_dir(d):
     os.makedirs(d, exist_ok=True)
 
+
+def log_decimate(x, y, nbins=1000):
+    """按对数频率等分为 nbins 个桶，每桶保留最小/最大值包络，仅用于绘图"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.size <= 2 * nbins or x[0] <= 0:
+        return x, y
+    edges = np.logspace(np.log10(x[0]), np.log10(x[-1]), nbins + 1)
+    # x 单调递增，桶编号也单调，可直接用 reduceat 按桶归约
+    bins = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, nbins - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], x.size] - 1
+    xs = np.column_stack([x[starts], x[ends]]).ravel()
+    ys = np.column_stack([np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)]).ravel()
+    return xs, ys
+
+
+def render_figure_png(fig, dpi=300):
+    """在 Tk 主线程把 Figure 渲染为未压缩的 PNG 内存缓冲；Figure 与其画布只能在主线程访问"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', pil_kwargs={'compress_level': 0})
+    buf.seek(0)
+    return buf
+
+
+def encode_rendered_image(buf, file_path, pil_kwargs, dpi=300):
+    """把 render_figure_png 的结果按目标格式压缩编码并写盘；只用 Pillow，可在后台线程执行"""
+    from PIL import Image
+    with Image.open(buf) as img:
+        if file_path.lower().endswith(('.jpg', '.jpeg')):
+            img = img.convert('RGB')
+        img.save(file_path, dpi=(dpi, dpi), **pil_kwargs)
+
+if NUMBA_AVAILABLE:
+    # 注意不开 fastmath：它假设不存在 inf/nan，会让下面的 isfinite 判断失效
+    @njit(cache=True)
+    def _rin_db_kernel(values, denom):
+        out = np.empty(values.size)
+        for i in range(values.size):
+            v = values[i]
+            d = denom[i]
+            if v > 0 and np.isfinite(v) and d != 0:
+                out[i] = 20.0 * np.log10(v / d)
+            else:
+                out[i] = -np.inf
+        return out
+
+    @njit(cache=True)
+    def _rin_power_kernel(x, y, segment_length):
+        nk = x.size // segment_length
+        out = np.empty(nk)
+        integral = 0.0
+        prev = 10.0 ** (y[0] / 10.0) if np.isfinite(y[0]) else 0.0
+        k = 0
+        for i in range(1, nk * segment_length):
+            cur = 10.0 ** (y[i] / 10.0) if np.isfinite(y[i]) else 0.0
+            integral += (x[i] - x[i-1]) * (cur + prev) / 2.0
+            prev = cur
+            if (i + 1) % segment_length == 0:
+                out[k] = math.sqrt(integral)
+                k += 1
+        return out
+
+    def _warmup_numba_kernels():
+        """用极小数组调用一次内核，触发编译/加载缓存，避免首次测量处理时卡顿"""
+        try:
+            x = np.arange(1.0, 13.0)
+            _rin_db_kernel(x, np.ones_like(x))
+            _rin_power_kernel(x, -x, 6)
+        except Exception:
+            pass
+
 # -----------------------------
 # Instrument layer: Rin_4051
 # -----------------------------
 class Rin_4051:
+    # 所有实例共享的 ResourceManager，首次 connect 时创建
+    _RM = None
+
     def __init__(self, ip=DEFAULT_IP, timeout_s=60.0, log_callback=None):
         self.ip = ip
         self.timeout_s = timeout_s
         self.rm = None
         self.inst = None
         self.log_callback = log_callback or (lambda s: print(s))
+        # 后台写盘线程：CSV/DAT 写文件与下一段的配置和扫描重叠进行；首次写盘时才启动，close() 时写完并结束
+        self._writer_q = queue.Queue()
+        self._writer_thread = None
+        self._writer_lock = threading.Lock()
 
     def log(self, s):
         try:
@@ -79,18 +159,58 @@ class Rin_4051:
         except Exception:
             print(s)
 
+    def _enqueue_write(self, path, payload, label):
+        with self._writer_lock:
+            if self._writer_thread is None or not self._writer_thread.is_alive():
+                self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+                self._writer_thread.start()
+        self._writer_q.put((path, payload, label))
+
+    def _writer_loop(self):
+        while True:
+            item = self._writer_q.get()
+            if item is None:
+                # 结束标记：之前排队的文件已全部写完
+                self._writer_q.task_done()
+                return
+            path, payload, label = item
+            try:
+                # 负载已在内存中拼好，一次 write 落盘（超过缓冲区大小时 BufferedWriter 直接整块写出）
+                with open(path, 'wb') as f:
+                    f.write(payload)
+                self.log(f"保存 {label}: {path}")
+            except Exception as e:
+                self.log(f"{label} 保存失败: {e}")
+            finally:
+                self._writer_q.task_done()
+
+    def flush_writes(self):
+        """阻塞等待所有已排队的文件写完"""
+        self._writer_q.join()
+
+    def _stop_writer(self):
+        """写完已排队的文件后结束写盘线程并等待其退出"""
+        with self._writer_lock:
+            t, self._writer_thread = self._writer_thread, None
+        if t is not None and t.is_alive():
+            self._writer_q.put(None)
+            t.join()
+
     def connect(self):
         self.log(f"尝试连接: {self.ip}")
 
         try:
-            # 每次重连都重新建 ResourceManager，避免 close() 清空的问题
-            self.rm = pyvisa.ResourceManager()
+            # 进程内共用一个 ResourceManager（close() 只关闭会话，不再关闭 RM）
+            if Rin_4051._RM is None:
+                Rin_4051._RM = pyvisa.ResourceManager()
+            self.rm = Rin_4051._RM
 
             # ---- 先试 VXI-11 (带 inst0) ----
             try:
                 res_str = f"TCPIP0::{self.ip}::inst0::INSTR"
                 self.inst = self.rm.open_resource(res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
+                self.inst.chunk_size = 1 << 20  # 1MB，整条 trace 一次读完，避免拆成多次底层读取
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
                 idn = self.inst.query("*IDN?").strip()
@@ -102,10 +222,10 @@ class Rin_4051:
 
             # ---- 再试 VXI-11 (不带 inst0) ----
             try:
-                self.rm = pyvisa.ResourceManager()
                 res_str = f"TCPIP0::{self.ip}::INSTR"
                 self.inst = self.rm.open_resource(res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
+                self.inst.chunk_size = 1 << 20  # 1MB，整条 trace 一次读完，避免拆成多次底层读取
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
                 idn = self.inst.query("*IDN?").strip()
@@ -117,10 +237,10 @@ class Rin_4051:
 
             # ---- 最后试 SOCKET ----
             try:
-                self.rm = pyvisa.ResourceManager()
                 res_str = f"TCPIP0::{self.ip}::5025::SOCKET"
                 self.inst = self.rm.open_resource(res_str)
                 self.inst.timeout = int(self.timeout_s * 1000)
+                self.inst.chunk_size = 1 << 20  # 1MB，整条 trace 一次读完，避免拆成多次底层读取
                 self.inst.read_termination = '\n'
                 self.inst.write_termination = '\n'
                 idn = self.inst.query("*IDN?").strip()
@@ -139,6 +259,8 @@ class Rin_4051:
 
 
     def close(self):
+        # 先把排队中的 CSV/DAT 写完，避免进程退出时随守护线程一起丢失
+        self._stop_writer()
         try:
             if self.inst:
                 try:
@@ -146,16 +268,20 @@ class Rin_4051:
                 except Exception:
                     pass
                 self.inst = None
-            if self.rm:
-                try:
-                    self.rm.close()
-                except Exception:
-                    pass
-                self.rm = None
             self.log("断开连接")
         except Exception as e:
             print("关闭时异常:", e)
 
+    @classmethod
+    def shutdown(cls):
+        """程序退出时关闭共享的 ResourceManager"""
+        if cls._RM is not None:
+            try:
+                cls._RM.close()
+            except Exception:
+                pass
+            cls._RM = None
+
     def write(self, cmd):
         try:
             self.log(f"写入 => {cmd}")
@@ -174,49 +300,79 @@ class Rin_4051:
             self.log(f"查询失败: {e}")
             raise
 
-    def configure(self, start_hz, stop_hz, rbw_hz=1000, vbw_hz=None, points=DEFAULT_POINTS, avg_count=1):
+    def stb(self):
+        """读取状态字节，作为轻量的仪器在线检查（比 *IDN? 少一次完整字符串往返）"""
+        try:
+            return self.inst.read_stb()
+        except Exception as e:
+            self.log(f"读取状态字节失败: {e}")
+            raise
+
+    def query_multi(self, cmds):
+        """将多条查询用 ';' 合并为一次往返，按顺序返回各条应答字符串"""
+        reply = self.query(";".join(cmds))
+        parts = [p.strip() for p in reply.strip().split(";")]
+        if len(parts) != len(cmds):
+            # 应答条数不符（部分仪器不支持复合查询），退回逐条查询
+            self.log(f"复合查询应答条数不符({len(parts)}/{len(cmds)})，改为逐条查询")
+            parts = [self.query(c).strip() for c in cmds]
+        return parts
+
+    def configure(self, start_hz, stop_hz, rbw_hz=1000, vbw_hz=None, points=DEFAULT_POINTS, avg_count=1, gui_display=False):
         if self.inst is None:
             raise RuntimeError("未连接到仪器")
         try:
+            # 所有配置拼成一条复合指令一次发送，再用一次 *OPC? 确认
             # 基础配置
-            self.write(f":FREQ:STARt {start_hz}")
-            self.write(f":FREQ:STOP {stop_hz}")
-            self.write(f":SWE:POINts {int(points)}")
-            self.write(f":BAND {rbw_hz}")
+            cmds = [
+                f":FREQ:STARt {start_hz}",
+                f":FREQ:STOP {stop_hz}",
+                f":SWE:POINts {int(points)}",
+                f":BAND {rbw_hz}",
+            ]
             if vbw_hz is not None:
-                self.write(f":BAND:VID {vbw_hz}")
+                cmds.append(f":BAND:VID {vbw_hz}")
             # 设置扫描类型规则为扫描速度优先
-            self.write(":SWE:TYPE:AUTO:RUL SPEed")
-            try:
-                self.write(":UNIT:POW V")
-            except Exception:
-                pass
+            cmds.append(":SWE:TYPE:AUTO:RUL SPEed")
+            cmds.append(":UNIT:POW V")
             # 平均配置
             if int(avg_count) <= 1:
-                self.write(":AVER:STATe OFF")
+                cmds.append(":AVER:STATe OFF")
             else:
-                self.write(":AVER:STATe ON")
-                self.write(f":AVER:COUNt {int(avg_count)}")
+                cmds.append(":AVER:STATe ON")
+                cmds.append(f":AVER:COUNt {int(avg_count)}")
             
-            # 添加轨迹配置 - 确保轨迹1处于活动状态并显示
-            self.write(":DISP:WIND:TRAC:MODE WRITE")  # 设置轨迹模式为写入
-            self.write(":TRAC1:MODE CLEAR WRITE")  # 清除并写入轨迹1
-            self.write(":TRAC1:TYPE AVER")  # 设置轨迹1为平均类型
+            # 添加轨迹配置 - 确保轨迹1处于活动状态
+            if gui_display:
+                cmds.append(":DISP:WIND:TRAC:MODE WRITE")  # 设置轨迹模式为写入
+            cmds.append(":TRAC1:MODE CLEAR WRITE")  # 清除并写入轨迹1
+            cmds.append(":TRAC1:TYPE AVER")  # 设置轨迹1为平均类型（决定读回的数据，始终发送）
             
             # 设置连续/单次扫描模式
-            self.write(":INIT:CONTinuous OFF")  # 设置为单次扫描模式
+            cmds.append(":INIT:CONTinuous OFF")  # 设置为单次扫描模式
+            
+            # 显示刷新 - 仅在需要在仪器屏幕上观察轨迹时开启，纯测量时省去屏幕渲染开销
+            if gui_display:
+                cmds.append(":DISP:UPD ON")  # 开启显示更新
             
-            # 显示刷新 - 确保屏幕上显示轨迹
-            self.write(":DISP:UPD ON")  # 开启显示更新
+            self.write(";".join(cmds))
+            self.query("*OPC?")
             
             self.log("配置完成")
-            return True
+            # 返回本次设置的快照，供 single_sweep_fetch 直接使用，省去回读查询
+            return {
+                "rbw": float(rbw_hz),
+                "points": int(points),
+                "avg": max(1, int(avg_count)),
+                "fstart": float(start_hz),
+                "fstop": float(stop_hz),
+            }
         except Exception as e:
             self.log(f"配置失败: {e}")
             return False
 
     # 在single_sweep_fetch方法中改进数据获取逻辑
-    def single_sweep_fetch(self, prefer_binary=True):
+    def single_sweep_fetch(self, prefer_binary=True, cfg=None):
         if self.inst is None:
             raise RuntimeError("未连接到仪器")
 
@@ -224,11 +380,21 @@ class Rin_4051:
         self.write(":INIT:CONT OFF")
         self.write(":INIT")
 
+        fstart = fstop = None
         try:
-            # 动态估算时间
-            rbw = float(self.query(":BAND?"))
-            points = int(self.query(":SWE:POINts?"))
-            avg_count = int(self.query(":AVER:COUNt?")) if self.query(":AVER:STATe?").strip() == "1" else 1
+            if cfg:
+                # configure() 刚设置过的参数直接使用，无需回读
+                fstart, fstop = cfg["fstart"], cfg["fstop"]
+                rbw, points, avg_count = cfg["rbw"], cfg["points"], cfg["avg"]
+            else:
+                # 动态估算时间：扫描参数与频率范围合并为一次查询
+                rbw_s, points_s, avg_state, avg_s, fstart_s, fstop_s = self.query_multi(
+                    [":BAND?", ":SWE:POINts?", ":AVER:STATe?", ":AVER:COUNt?", ":FREQ:STAR?", ":FREQ:STOP?"]
+                )
+                fstart, fstop = float(fstart_s), float(fstop_s)
+                rbw = float(rbw_s)
+                points = int(float(points_s))
+                avg_count = int(float(avg_s)) if avg_state == "1" else 1
 
             # 粗略估计扫描时间（经验公式，可根据实测调整）
             base_time = 0.05  # 基础时间 50ms
@@ -242,38 +408,41 @@ class Rin_4051:
         except Exception:
             wait_time = 1.0  # 参数获取失败时，默认等 1s
 
-        # 主动问 OPC，直到扫完
-        start = time.time()
-        while time.time() - start < wait_time:
+        # 单次阻塞 *OPC? 等待扫描完成，超时不短于估算时间，避免每 50ms 轮询一次
+        orig_timeout = self.inst.timeout
+        try:
+            self.inst.timeout = max(orig_timeout, int(wait_time * 1000))
+            self.query("*OPC?")
+        except Exception as e:
+            self.log(f"[智能等待] *OPC? 等待异常: {e}")
+        finally:
+            self.inst.timeout = orig_timeout
+
+        # 获取频率范围（复合查询失败时单独再取）
+        if fstart is None or fstop is None:
             try:
-                if self.query("*OPC?").strip() == "1":
-                    break
+                fstart = float(self.query(":FREQ:STAR?"))
+                fstop = float(self.query(":FREQ:STOP?"))
             except Exception:
-                pass
-            time.sleep(0.05)
-
-        # 获取频率范围
-        try:
-            fstart = float(self.query(":FREQ:STAR?"))
-            fstop = float(self.query(":FREQ:STOP?"))
-        except Exception:
-            fstart, fstop = 0.0, 1.0
+                fstart, fstop = 0.0, 1.0
 
         # 读取 trace 数据
         if prefer_binary:
             try:
                 self.write(":FORM:DATA REAL,32")
-                vals = self.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype="f", is_big_endian=False)
-                vals = np.array(vals, dtype=float)
-                freqs = np.linspace(fstart, fstop, len(vals))
+                vals = self.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype="f", is_big_endian=False,
+                                                     header_fmt='ieee', container=np.ndarray)
+                # pyvisa 已直接返回 ndarray，只做一次 float32 -> float64 转换
+                vals = vals.astype(np.float64, copy=False)
+                freqs = np.linspace(fstart, fstop, num=vals.size, dtype=np.float64)
                 return freqs, vals, True
             except Exception as e:
                 self.log(f"二进制读取失败: {e}, 改用 ASCII")
 
         # ASCII 备选
         raw = self.inst.query(":TRAC:DATA? TRACE1")
-        parts = [p for p in raw.replace("\n", ",").split(",") if p.strip()]
-        vals = np.array([float(p) for p in parts], dtype=float)
+        # 在 C 层直接解析逗号分隔文本；先去掉首尾多余的分隔符，避免末尾空字段
+        vals = np.fromstring(raw.strip().replace("\n", ",").strip(","), sep=",", dtype=np.float64)
         freqs = np.linspace(fstart, fstop, len(vals))
         return freqs, vals, False
 
@@ -295,41 +464,43 @@ class Rin_4051:
             # still allow but warn
             self.log("警告: 数据长度不是4的倍数")
         count = data_len // 4
-        vals = struct.unpack(f"<{count}f", data_block[:count*4])
-        return list(vals)
+        # 直接以 ndarray 视图解释数据块（只读、零拷贝），不再生成 tuple/list
+        return np.frombuffer(data_block, dtype='<f4', count=count)
 
-    def fetch_and_save_trace(self, output_dir, base_name=None, prefer_binary=True, save_csv=True, save_dat=True):
+    def fetch_and_save_trace(self, output_dir, base_name=None, prefer_binary=True, save_csv=True, save_dat=True, cfg=None):
+        """返回的 CSV/DAT 路径由后台线程写入，使用这些文件前需先调用 flush_writes()（close() 也会写完）"""
         base_name = base_name or now_str()
         ensure_dir(output_dir)
-        freqs, values, was_binary = self.single_sweep_fetch(prefer_binary=prefer_binary)
+        freqs, values, was_binary = self.single_sweep_fetch(prefer_binary=prefer_binary, cfg=cfg)
+        # single_sweep_fetch 的二进制与 ASCII 路径都返回 float64 ndarray，后续不再逐元素 float() 转换
+        assert isinstance(values, np.ndarray), "single_sweep_fetch 应返回 ndarray"
         csv_path = None
         dat_path = None
         if save_csv:
             csv_path = os.path.join(output_dir, base_name + ".csv")
             try:
-                with open(csv_path, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["Frequency(Hz)", "Value"])
-                    for fr, va in zip(freqs, values):
-                        writer.writerow([f"{fr:.9f}", f"{va:.9e}"])
-                self.log(f"保存 CSV: {csv_path}")
+                # 在内存中格式化好，交给后台线程写盘
+                buf = BytesIO()
+                np.savetxt(buf, np.column_stack([freqs, values]), fmt=["%.9f", "%.9e"],
+                           delimiter=",", header="Frequency(Hz),Value", comments="")
+                self._enqueue_write(csv_path, buf.getvalue(), "CSV")
             except Exception as e:
                 self.log(f"CSV 保存失败: {e}")
                 csv_path = None
         if save_dat:
             dat_path = os.path.join(output_dir, base_name + ".dat")
             try:
-                data_block = struct.pack(f"<{len(values)}f", *[float(v) for v in values])
+                # 小端 float32 数组，直接以字节视图拼接，不再逐元素展开给 struct.pack
+                data_block = np.ascontiguousarray(values, dtype='<f4').view(np.uint8)
                 # SCPI-like block header formation (guard maximum len-of-len = 9)
-                data_len_ascii = str(len(data_block)).encode('ascii')   # e.g. b'1024'
+                data_len_ascii = str(data_block.size).encode('ascii')   # e.g. b'1024'
                 if len(data_len_ascii) > 9:
                     raise ValueError("数据块太大，无法用标准 SCPI 单字符头表示")
                 len_of_len = str(len(data_len_ascii)).encode('ascii')  # single-digit
-                header = b"#" + len_of_len + data_len_ascii
-                with open(dat_path, 'wb') as f:
-                    f.write(header)
-                    f.write(data_block)
-                self.log(f"保存 DAT: {dat_path}")
+                # 头部与数据拼进同一个缓冲区，写盘时一次系统调用完成
+                buf = bytearray(b"#" + len_of_len + data_len_ascii)
+                buf += data_block
+                self._enqueue_write(dat_path, buf, "DAT")
             except Exception as e:
                 self.log(f"DAT 保存失败: {e}")
                 dat_path = None
@@ -348,12 +519,13 @@ class RinWorkflow:
         self.amplification = 14
         self.segments = DEFAULT_SEGMENTS.copy()
         self.points_expected = DEFAULT_POINTS
-        # processed
+        # processed（freqs_all/values_all 为各段 ndarray 的列表）
         self.freqs_all = []
         self.values_all = []
-        self.rin_ddx = []
-        self.rin_ddy = []
-        self.rin_power = []
+        # 处理结果均为 float64 ndarray，供绘图直接使用
+        self.rin_ddx = np.empty(0)
+        self.rin_ddy = np.empty(0)
+        self.rin_power = np.empty(0)
 
     def request_stop(self):
         self.log("[用户] 请求停止")
@@ -391,7 +563,7 @@ class RinWorkflow:
         
             if progress_callback:
                 progress_callback(idx/seg_count, f"配置第{idx+1}段...")
-            ok = self.analyzer.configure(start_hz=start, stop_hz=stop, rbw_hz=rbw, vbw_hz=None, points=self.points_expected, avg_count=avg)
+            ok = self.analyzer.configure(start_hz=start, stop_hz=stop, rbw_hz=rbw, vbw_hz=None, points=self.points_expected, avg_count=avg, gui_display=False)
             if not ok:
                 self.log(f"段 {idx+1} 配置失败，跳过")
                 continue
@@ -403,14 +575,14 @@ class RinWorkflow:
                 
                 # 增加额外的稳定性检查
                 try:
-                    # 发送额外的查询命令来确认仪器状态
-                    self.analyzer.query("*IDN?")
+                    # 读取状态字节确认仪器在线
+                    self.analyzer.stb()
                     self.log("[特殊处理] 仪器状态确认成功")
                 except Exception as e:
                     self.log(f"[特殊处理] 状态确认异常: {e}")
                     # 重新配置这个频段
                     self.log("[特殊处理] 重新配置1k-10k频段...")
-                    ok = self.analyzer.configure(start_hz=start, stop_hz=stop, rbw_hz=rbw, vbw_hz=None, points=self.points_expected, avg_count=avg)
+                    ok = self.analyzer.configure(start_hz=start, stop_hz=stop, rbw_hz=rbw, vbw_hz=None, points=self.points_expected, avg_count=avg, gui_display=False)
                     if not ok:
                         self.log("[特殊处理] 重新配置失败，跳过该段")
                         continue
@@ -422,8 +594,8 @@ class RinWorkflow:
                 
                 # 增加额外的稳定性检查
                 try:
-                    # 发送额外的查询命令来确认仪器状态
-                    self.analyzer.query("*IDN?")
+                    # 读取状态字节确认仪器在线
+                    self.analyzer.stb()
                     self.log("[特殊处理] 仪器状态确认成功")
                 except Exception as e:
                     self.log(f"[特殊处理] 状态确认异常: {e}")
@@ -432,15 +604,17 @@ class RinWorkflow:
                 progress_callback((idx+0.2)/seg_count, f"测量第{idx+1}段...")
             try:
                 base_name = f"{fname.split('.')[0]}_{timestamp}"
-                csvp, datap, freqs, vals = self.analyzer.fetch_and_save_trace(session_dir, base_name=base_name, prefer_binary=prefer_binary, save_csv=save_csv, save_dat=save_dat)
+                csvp, datap, freqs, vals = self.analyzer.fetch_and_save_trace(session_dir, base_name=base_name, prefer_binary=prefer_binary, save_csv=save_csv, save_dat=save_dat, cfg=ok)
             except Exception as e:
                 self.log(f"段 {idx+1} 测量失败: {e}")
                 continue
-            # extend lists robustly
-            self.freqs_all.extend(np.array(freqs, dtype=float).tolist())
-            self.values_all.extend(np.array(vals, dtype=float).tolist())
+            # 每段保存为 ndarray（fetch_and_save_trace 已保证为 float64），处理时再统一拼接
+            self.freqs_all.append(freqs)
+            self.values_all.append(vals)
             if progress_callback:
                 progress_callback((idx+1)/seg_count, f"完成第{idx+1}/{seg_count}段")
+        # 等待后台写盘线程把本次所有文件写完（异常中断时由 close() 写完）
+        self.analyzer.flush_writes()
         if self.stop_flag:
             self.log("测量中止，跳过处理")
             return False
@@ -450,73 +624,54 @@ class RinWorkflow:
         return True
 
     def _process_data(self):
-        self.rin_ddx = []
-        self.rin_ddy = []
-        n = len(self.values_all)
-        if n == 0:
+        self.rin_ddx = np.empty(0)
+        self.rin_ddy = np.empty(0)
+        self.rin_power = np.empty(0)
+        if not self.values_all:
             self.log("无数据，处理结束")
             return
-        freqs = np.array(self.freqs_all, dtype=float)
-        values = np.array(self.values_all, dtype=float)
-        # build scale mapping similar to user's earlier logic
-        scale = np.ones(n, dtype=float)
-        seg_lengths = []
-        pos = 0
-        for i, seg in enumerate(self.segments):
-            expected = self.points_expected
-            actual = min(expected, max(0, n - pos))
-            seg_lengths.append(actual)
-            pos += actual
-            if pos >= n:
-                break
-        rem = n - sum(seg_lengths)
-        if rem > 0:
-            seg_lengths.append(rem)
-        idx0 = 0
-        for i, L in enumerate(seg_lengths):
-            idx1 = idx0 + L
-            if i < 2:
-                scale[idx0:idx1] = math.sqrt(5)
-            else:
-                scale[idx0:idx1] = math.sqrt(30)
-            idx0 = idx1
-        ddx = freqs.tolist()
-        ddy = []
-        for i, v in enumerate(values):
-            try:
-                if v <= 0 or not np.isfinite(v):
-                    ddy.append(float('-inf'))
-                else:
-                    denom = (self.dc_value * self.amplification * scale[i])
-                    if denom == 0:
-                        ddy.append(float('-inf'))
-                    else:
-                        ddy.append(20.0 * math.log10(v / denom))
-            except Exception:
-                ddy.append(float('-inf'))
-        self.rin_ddx = ddx
+        # 各段数组最后一次性拼接
+        freqs = np.concatenate(self.freqs_all).astype(np.float64, copy=False)
+        values = np.concatenate(self.values_all).astype(np.float64, copy=False)
+        n = len(values)
+        # build scale mapping similar to user's earlier logic:
+        # 前两段(每段 points_expected 点)使用 sqrt(5)，其余使用 sqrt(30)
+        scale = np.where(np.arange(n) < 2 * self.points_expected, math.sqrt(5), math.sqrt(30))
+        denom = self.dc_value * self.amplification * scale
+        # 非正值、非有限值或分母为 0 的点记为 -inf，其余换算为 dB
+        if NUMBA_AVAILABLE:
+            ddy = _rin_db_kernel(values, denom)
+        else:
+            mask = (values > 0) & np.isfinite(values) & (denom != 0)
+            ddy = np.full(n, -np.inf)
+            ddy[mask] = 20.0 * np.log10(values[mask] / denom[mask])
+        self.rin_ddx = freqs
         self.rin_ddy = ddy
         self.rin_power = self.compute_rin_power(self.rin_ddx, self.rin_ddy)
 
     def compute_rin_power(self, x, y):
-        power = []
         segment_length = 6
         if len(x) < 2:
-            return power
-        for k in range(1, len(x) // segment_length + 1):
-            sub_x = x[:k*segment_length]
-            sub_y = [np.power(10, val / 10.0) if np.isfinite(val) else 0.0 for val in y[:k*segment_length]]
-            integral = 0.0
-            for i in range(1, len(sub_x)):
-                dx = sub_x[i] - sub_x[i-1]
-                integral += dx * (sub_y[i] + sub_y[i-1]) / 2.0
-            power.append(math.sqrt(integral))
-        return power
+            return np.empty(0)
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            return _rin_power_kernel(x, y, segment_length)
+        # 一次算出累积梯形积分，cum[i] 即 x[0]..x[i] 区间的积分值
+        y_lin = np.where(np.isfinite(y), np.power(10.0, y / 10.0), 0.0)
+        trap = 0.5 * np.diff(x) * (y_lin[1:] + y_lin[:-1])
+        cum = np.concatenate(([0.0], np.cumsum(trap)))
+        # 每 segment_length 个点取一次前缀积分
+        ks = np.arange(1, len(x) // segment_length + 1) * segment_length - 1
+        return np.sqrt(cum[ks])
 
 # -----------------------------
 # GUI class following the user's reference style
 # -----------------------------
 class Rin_4051_GUI:
+    # 保存结果图时的 PNG 压缩级别（0~9），级别越低编码越快、文件略大
+    PNG_COMPRESS_LEVEL = 1
+
     def __init__(self, parent=None):
         self.parent = parent
         
@@ -553,6 +708,25 @@ class Rin_4051_GUI:
         self.analyzer = None
         self.workflow = None
         self.worker_thread = None
+        # 底噪曲线窗口只保留一个，其 Figure/画布在多次底噪测试之间复用（一个 Figure 只挂在一个画布上）
+        self._bg_win = None
+        self._bg_fig = None
+        self._bg_ax = None
+        self._bg_canvas = None
+        # RIN 结果窗口及其 Figure/曲线，在多次测量之间复用
+        self._rin_win = None
+        self._rin_fig = None
+        self._rin_ax1 = None
+        self._rin_ax2 = None
+        self._rin_line1 = None
+        self._rin_line2 = None
+        self._rin_canvas = None
+        # 最近一次图像预览 ((路径, 修改时间), PhotoImage)
+        self._last_preview = None
+
+        # 后台预编译 numba 内核，与用户填写参数、连接仪器的时间重叠
+        if NUMBA_AVAILABLE:
+            threading.Thread(target=_warmup_numba_kernels, daemon=True).start()
 
     def create_widgets(self):
         # 主容器：左侧为参数设置，右侧为运行日志
@@ -741,8 +915,9 @@ class Rin_4051_GUI:
             # 修改：直接读取数据，不再调用 single_sweep_fetch（避免重复初始化）
             self.log("尝试二进制读取 TRACE (REAL,32)...")
             analyzer.write(":FORM:DATA REAL,32")
-            vals = analyzer.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype='f', is_big_endian=False)
-            vals = np.array(vals, dtype=float)
+            vals = analyzer.inst.query_binary_values(":TRAC:DATA? TRACE1", datatype='f', is_big_endian=False,
+                                                     header_fmt='ieee', container=np.ndarray)
+            vals = vals.astype(np.float64, copy=False)
             
             # 获取频率信息
             fstart = float(analyzer.query(":FREQ:STAR?"))
@@ -759,44 +934,38 @@ class Rin_4051_GUI:
             if not freqs.size or not vals.size:
                 raise RuntimeError("未能获取有效的曲线数据")
 
-            # 弹窗显示曲线
-            win = tk.Toplevel(self.root)
-            win.title("底噪曲线")
-            win.geometry("800x600")
-
-            fig, ax = plt.subplots(figsize=(7, 4))
-            ax.plot(freqs, vals, linewidth=1)
-            ax.set_xscale("log")
-            ax.set_title("Noise Floor", fontsize=14, fontweight='bold')
-            ax.set_xlabel("Frequency (Hz)", fontsize=12)
-            ax.set_ylabel("Power (V)", fontsize=12)
-            
-            # 添加网格线样式区分
-            ax.grid(which='major', linestyle='-', linewidth='0.7', color='gray')
-            ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
-
-            canvas = FigureCanvasTkAgg(fig, master=win)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-            # 保存按钮
-            def save_curve():
-                fn = filedialog.asksaveasfilename(
-                    initialdir=outdir,
-                    defaultextension=".png",
-                    filetypes=[("PNG 文件", "*.png")]
-                )
-                if fn:
-                    fig.savefig(fn, dpi=300, bbox_inches="tight")
-                    messagebox.showinfo("提示", f"曲线已保存到: {fn}", parent=win)
-
-            tk.Button(win, text="保存曲线", command=save_curve).pack(pady=8)
-
-            # 居中弹窗
-            win.update_idletasks()
-            x = (win.winfo_screenwidth() - win.winfo_width()) // 2
-            y = (win.winfo_screenheight() - win.winfo_height()) // 2
-            win.geometry(f"+{x}+{y}")
+            # 弹窗显示曲线：窗口已打开时直接更新其中的曲线，否则新建
+            win = self._bg_win
+            if win is not None and win.winfo_exists():
+                self._plot_background(freqs, vals)
+                win.lift()
+            else:
+                win = tk.Toplevel(self.root)
+                win.title("底噪曲线")
+                win.geometry("800x600")
+
+                fig = self._make_plot_window(win)
+                self._plot_background(freqs, vals)
+
+                # 保存按钮
+                def save_curve():
+                    fn = filedialog.asksaveasfilename(
+                        # 窗口会在多次测试间复用，按点击时的输出目录打开
+                        initialdir=self.params.get("OUTPUT_DIR") or DEFAULT_OUTPUT_DIR,
+                        defaultextension=".png",
+                        filetypes=[("PNG 文件", "*.png")]
+                    )
+                    if fn:
+                        fig.savefig(fn, dpi=300, bbox_inches="tight")
+                        messagebox.showinfo("提示", f"曲线已保存到: {fn}", parent=win)
+
+                tk.Button(win, text="保存曲线", command=save_curve).pack(pady=8)
+
+                # 居中弹窗
+                win.update_idletasks()
+                x = (win.winfo_screenwidth() - win.winfo_width()) // 2
+                y = (win.winfo_screenheight() - win.winfo_height()) // 2
+                win.geometry(f"+{x}+{y}")
 
         except Exception as e:
             self.log(f"[底噪] 操作失败: {e}")
@@ -804,24 +973,56 @@ class Rin_4051_GUI:
         finally:
             analyzer.close()
 
-    def visualize_data(self):
-        """可视化 RIN 测试结果"""
-        if not self.workflow or not self.workflow.rin_ddx or not self.workflow.rin_ddy:
-            print("没有可视化的数据")
-            return
+    def _make_plot_window(self, win):
+        """在弹窗 win 中创建底噪曲线的 Figure 与画布并返回 Figure；该窗口存在期间重复测试只更新曲线"""
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-        ddx = self.workflow.rin_ddx
-        ddy = self.workflow.rin_ddy
-        rin_power = self.workflow.rin_power
+        fig = Figure(figsize=(7, 4))
+        canvas = FigureCanvasTkAgg(fig, master=win)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._bg_win = win
+        self._bg_fig, self._bg_ax, self._bg_canvas = fig, fig.add_subplot(111), canvas
+        win.protocol("WM_DELETE_WINDOW", self._close_bg_window)
+        return fig
+
+    def _close_bg_window(self):
+        """关闭底噪窗口：清空 Figure 并释放引用，下次测试重新建窗"""
+        if self._bg_fig is not None:
+            self._bg_fig.clf()
+        if self._bg_win is not None:
+            self._bg_win.destroy()
+        self._bg_win = None
+        self._bg_fig = self._bg_ax = self._bg_canvas = None
+
+    def _plot_background(self, freqs, vals):
+        """清空底噪窗口的坐标轴并重绘曲线"""
+        ax = self._bg_ax
+        ax.cla()
+
+        # 先按对数频率分桶取最小/最大包络再绘图，减少 Agg 渲染的数据量（原始数据不变）
+        plot_x, plot_y = log_decimate(freqs, vals)
+        ax.plot(plot_x, plot_y, linewidth=1)
+        ax.set_xscale("log")
+        ax.set_title("Noise Floor", fontsize=14, fontweight='bold')
+        ax.set_xlabel("Frequency (Hz)", fontsize=12)
+        ax.set_ylabel("Power (V)", fontsize=12)
+        
+        # 添加网格线样式区分
+        ax.grid(which='major', linestyle='-', linewidth='0.7', color='gray')
+        ax.grid(which='minor', linestyle=':', linewidth='0.5', color='gray')
+
+        self._bg_canvas.draw_idle()
+
+    def _build_rin_window(self):
+        """创建 RIN 结果窗口与 Figure（只做一次性设置），曲线对象保存在实例上供后续更新"""
+        from matplotlib.ticker import MaxNLocator
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
         root = tk.Toplevel(self.root)
         root.title("测RIN数据可视化")
 
-        fig, (ax1, ax2) = plt.subplots(
-            2, 1, figsize=(10, 8),
-            gridspec_kw={'height_ratios': [3, 2]}
-        )
-
         # -------- 保存按钮 --------
         def save_figure():
             file_path = filedialog.asksaveasfilename(
@@ -830,100 +1031,204 @@ class Rin_4051_GUI:
                         ("JPEG files", "*.jpg"),
                         ("All files", "*.*")]
             )
-            if file_path:
-                fig.savefig(file_path, dpi=300, bbox_inches='tight')
-                messagebox.showinfo("成功", f"图像已保存到 {file_path}")
+            if not file_path:
+                return
+            # 300 dpi 大图的耗时主要在 Pillow 编码，关闭 optimize 并降低 PNG 压缩级别
+            lower = file_path.lower()
+            if lower.endswith(('.jpg', '.jpeg')):
+                pil_kwargs = {'quality': 90, 'optimize': False}
+            elif lower.endswith('.png'):
+                pil_kwargs = {'compress_level': self.PNG_COMPRESS_LEVEL, 'optimize': False}
+            else:
+                # SVG/PDF/EPS 等 Pillow 不支持的格式（或未写扩展名）仍交给 matplotlib，在主线程同步保存
+                try:
+                    self._rin_fig.savefig(file_path, dpi=300, bbox_inches='tight')
+                    messagebox.showinfo("成功", f"图像已保存到 {file_path}", parent=root)
+                except Exception as e:
+                    messagebox.showerror("保存失败", f"保存图像时出错: {e}", parent=root)
+                return
+
+            def on_done(err):
+                save_btn.config(state='normal')
+                if err is None:
+                    messagebox.showinfo("成功", f"图像已保存到 {file_path}", parent=root)
+                else:
+                    messagebox.showerror("保存失败", f"保存图像时出错: {err}", parent=root)
+
+            # 渲染必须在主线程完成：savefig 会临时改 fig.dpi 并重排版，与窗口缩放/重绘并发会互相破坏
+            try:
+                buf = render_figure_png(self._rin_fig)
+            except Exception as e:
+                messagebox.showerror("保存失败", f"保存图像时出错: {e}", parent=root)
+                return
+
+            def do_save():
+                err = None
+                try:
+                    encode_rendered_image(buf, file_path, pil_kwargs)
+                except Exception as e:
+                    err = e
+                root.after(0, lambda: on_done(err))
+
+            # 后台线程只做 Pillow 压缩编码与写盘，不再接触 Figure；保存期间禁用按钮
+            save_btn.config(state='disabled')
+            threading.Thread(target=do_save, daemon=True).start()
 
         top_frame = tk.Frame(root)
         top_frame.pack(side=tk.TOP, fill=tk.X, pady=10)
-        tk.Button(
+        save_btn = tk.Button(
             top_frame, text="保存", command=save_figure,
             font=('SimHei', 20)
-        ).pack(side=tk.TOP)
+        )
+        save_btn.pack(side=tk.TOP)
+
+        # 直接使用 Figure（不经 pyplot 管理），窗口关闭后可被回收
+        fig = Figure(figsize=(10, 8))
+        # 固定 GridSpec 边距，创建时一次确定布局，不再每次绘制后跑 tight_layout
+        gs = fig.add_gridspec(2, 1, height_ratios=[3, 2], hspace=0.15,
+                              left=0.15, right=0.97, top=0.97, bottom=0.1)
+        ax1 = fig.add_subplot(gs[0])
+        ax2 = fig.add_subplot(gs[1])
 
         # -------- 图1: RIN 曲线 --------
-        ax1.plot(ddx, ddy, color="#085cab", linewidth=2)
+        line1, = ax1.plot([], [], color="#085cab", linewidth=2)
         ax1.set_xscale('log')
         ax1.margins(x=0)
         ax1.set_ylabel('RIN (dBc/Hz)', fontsize=18, fontweight='bold')
         ax1.grid(True, which='both', lw=2, linestyle='--', alpha=1)
         ax1.set_xlim(10, 10**7)
-
-        # 边框加粗
-        for spine in ax1.spines.values():
-            spine.set_linewidth(2.5)
-        # 坐标刻度字体
-        for label in ax1.get_xticklabels() + ax1.get_yticklabels():
-            label.set_fontname('Times New Roman')
-            label.set_fontsize(20)
-            label.set_fontweight('bold')
-
-        finite_ddy = [v for v in ddy if np.isfinite(v)]
-        if finite_ddy:
-            ax1.set_ylim(
-                np.floor(min(finite_ddy)/10)*10,
-                np.ceil(max(finite_ddy)/10)*10
-            )
         ax1.yaxis.set_major_locator(MaxNLocator(nbins=6, integer=True))
 
         # -------- 图2: RMS 积分曲线 --------
-        adjusted_power = [p * 100 for p in rin_power]
-        ax2.plot(ddx[::6], adjusted_power, color="#085cab", linewidth=2)
+        line2, = ax2.plot([], [], color="#085cab", linewidth=2)
         ax2.set_xscale('log')
         ax2.margins(x=0)
         ax2.set_xlim(10, 10**7)
-
-        y2_min, y2_max = np.min(adjusted_power), np.max(adjusted_power)
-        if np.isclose(y2_min, y2_max):
-            y2_min, y2_max = y2_min - 1, y2_max + 1
-        y2_mid = (y2_min + y2_max) / 2
-        ax2.set_yticks([y2_min, y2_mid, y2_max])
-        ax2.set_yticklabels(
-            [f"{y2_min:.3f}%", f"{y2_mid:.3f}%", f"{y2_max:.3f}%"]
-        )
-
         ax2.set_xlabel('Frequency(Hz)', fontsize=18, fontweight='bold')
         ax2.set_ylabel('Integrated RMS', fontsize=18, fontweight='bold')
         ax2.grid(True, which='both', lw=2, linestyle='--', alpha=1)
 
-        for spine in ax2.spines.values():
-            spine.set_linewidth(2.5)
-        for label in ax2.get_xticklabels() + ax2.get_yticklabels():
-            label.set_fontname('Times New Roman')
-            label.set_fontsize(20)
-            label.set_fontweight('bold')
-
-        plt.tight_layout()
-        plt.subplots_adjust(hspace=0.15)
+        # 刻度标签（Times New Roman 加粗 20 号）与边框线宽只在建窗时设置一次；
+        # 之后新生成的刻度会复制首个刻度的字体属性，更新曲线时无需再逐个设置
+        for ax in (ax1, ax2):
+            for spine in ax.spines.values():
+                spine.set_linewidth(2.5)
+            for label in ax.get_xticklabels() + ax.get_yticklabels():
+                label.set_fontname('Times New Roman')
+                label.set_fontsize(20)
+                label.set_fontweight('bold')
 
         canvas = FigureCanvasTkAgg(fig, master=root)
-        canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+        self._rin_win = root
+        self._rin_fig, self._rin_ax1, self._rin_ax2 = fig, ax1, ax2
+        self._rin_line1, self._rin_line2 = line1, line2
+        self._rin_canvas = canvas
+        root.protocol("WM_DELETE_WINDOW", self._close_rin_window)
+
+    def _close_rin_window(self):
+        """关闭 RIN 结果窗口：清空 Figure 并释放引用，使其随窗口一起被回收"""
+        if self._rin_fig is not None:
+            self._rin_fig.clf()
+        if self._rin_win is not None:
+            self._rin_win.destroy()
+        self._rin_win = None
+        self._rin_fig = self._rin_ax1 = self._rin_ax2 = None
+        self._rin_line1 = self._rin_line2 = None
+        self._rin_canvas = None
+
+    def visualize_data(self):
+        """可视化 RIN 测试结果"""
+        if not self.workflow or len(self.workflow.rin_ddx) == 0 or len(self.workflow.rin_ddy) == 0:
+            print("没有可视化的数据")
+            return
+
+        # RinWorkflow 产出的已是连续 float64 数组，绘图/统计直接使用，不再转换
+        ddx = self.workflow.rin_ddx
+        ddy = self.workflow.rin_ddy
+        rin_power = self.workflow.rin_power
+
+        # 结果窗口只在首次（或被关闭后）创建，之后的测量只更新曲线数据和坐标范围
+        if self._rin_win is None or not self._rin_win.winfo_exists():
+            self._build_rin_window()
+        root = self._rin_win
+        ax1, ax2 = self._rin_ax1, self._rin_ax2
+
+        # -------- 图1: RIN 曲线 --------
+        # 绘图只用对数分桶后的最小/最大包络（点数与屏幕像素同量级），完整数组仍用于统计与取值
+        self._rin_line1.set_data(*log_decimate(ddx, ddy))
+        # 上次测量的 set_ylim 会关闭自动缩放，这里按新数据重新开启
+        ax1.relim()
+        ax1.autoscale(enable=True, axis='y')
+        # ±inf 先换成 NaN，再用 nanmin/nanmax 一次 C 级归约求上下限
+        finite_mask = np.isfinite(ddy)
+        if finite_mask.any():
+            ddy_finite = np.where(finite_mask, ddy, np.nan)
+            ax1.set_ylim(
+                np.floor(np.nanmin(ddy_finite)/10)*10,
+                np.ceil(np.nanmax(ddy_finite)/10)*10
+            )
+
+        # -------- 图2: RMS 积分曲线 --------
+        adjusted_power = rin_power * 100.0
+        # 每 6 点一个积分值；点数不是 6 的整数倍时截齐长度，避免 x/y 长度不一致
+        ddx_rms = ddx[::6][:len(adjusted_power)]
+        self._rin_line2.set_data(*log_decimate(ddx_rms, adjusted_power))
+        ax2.relim()
+        ax2.autoscale(enable=True, axis='y')
+
+        # 最小/中点/最大三个刻度；曲线平坦时上下各扩 1 保证刻度不重合
+        y2_min, y2_max = adjusted_power.min(), adjusted_power.max()
+        if y2_max - y2_min < 1e-12:
+            y2_min, y2_max = y2_min - 1, y2_max + 1
+        ticks = np.linspace(y2_min, y2_max, 3)
+        ax2.set_yticks(ticks)
+        ax2.set_yticklabels([f"{t:.3f}%" for t in ticks])
+
+        self._rin_canvas.draw_idle()
+        root.deiconify()
+        root.lift()
+
         # -------- 提取指定点的 RIN 值 --------
-        target_xs = [1000, 10000, 100000, 1000000]
-        result_text = ""
-        for tx in target_xs:
-            idx = np.argmin(np.abs(np.array(ddx) - tx))
-            x_val = ddx[idx]
-            y_val = ddy[idx]
-            result_text += f"x={x_val:.0f} 时, y={y_val:.3f} dBc/Hz\n"
+        target_xs = np.array([1000, 10000, 100000, 1000000], dtype=np.float64)
+        if np.all(ddx[1:] >= ddx[:-1]):
+            # 各段按频率递增拼接，ddx 单调不减，可用二分查找一次定位所有目标点
+            right = np.clip(np.searchsorted(ddx, target_xs), 0, len(ddx) - 1)
+            left = np.clip(right - 1, 0, len(ddx) - 1)
+            # 取左右相邻点中更近的一个（距离相同取左侧，与 argmin 取首个一致）
+            idxs = np.where(np.abs(ddx[left] - target_xs) <= np.abs(ddx[right] - target_xs), left, right)
+        else:
+            # 段顺序被改动导致 ddx 非单调时，广播一次算出所有目标点的最近索引
+            idxs = np.abs(ddx[:, None] - target_xs[None, :]).argmin(axis=0)
+        result_text = "".join(
+            f"x={x_val:.0f} 时, y={y_val:.3f} dBc/Hz\n" for x_val, y_val in zip(ddx[idxs], ddy[idxs])
+        )
 
         messagebox.showinfo("指定点的RIN值", result_text, parent=root)
 
 
 
     def show_image_popup(self, img_path, save_button_top_center=False):
+        from PIL import Image, ImageTk
         try:
             win = tk.Toplevel(self.root)
             win.title("图像预览")
-            img = Image.open(img_path)
             maxw, maxh = 900, 700
-            w, h = img.size
-            if w > maxw or h > maxh:
-                ratio = min(maxw / w, maxh / h)
-                img = img.resize((int(w*ratio), int(h*ratio)))
-            img_tk = ImageTk.PhotoImage(img)
+            # 同一文件（路径与修改时间都未变）再次预览时直接复用上次的 PhotoImage
+            key = (os.path.abspath(img_path), os.path.getmtime(img_path))
+            if self._last_preview is not None and self._last_preview[0] == key:
+                img_tk = self._last_preview[1]
+            else:
+                img = Image.open(img_path)
+                # JPEG 先在解码阶段按 DCT 缩放（draft），再原地缩成预览尺寸，避免整幅解码
+                img.draft('RGB', (maxw, maxh))
+                img.thumbnail((maxw, maxh), Image.BILINEAR)
+                # 先转成 RGB，交给 Tk 的像素块无需再逐像素做模式转换
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGB')
+                img_tk = ImageTk.PhotoImage(img)
+                self._last_preview = (key, img_tk)
 
             lbl = tk.Label(win, image=img_tk)
             lbl.image = img_tk
@@ -936,7 +1241,9 @@ class Rin_4051_GUI:
                                                 parent=win)
                 if tgt:
                     try:
-                        img.save(tgt)
+                        # 预览图已缩小，保存时重新从原文件读取全分辨率图像
+                        with Image.open(img_path) as full_img:
+                            full_img.save(tgt)
                         messagebox.showinfo("保存", f"已保存到: {tgt}", parent=win)
                     except Exception as e:
                         messagebox.showerror("保存失败", f"保存图片时出错: {e}", parent=win)
@@ -959,6 +1266,7 @@ class Rin_4051_GUI:
 
     def run(self):
         self.root.mainloop()
+        Rin_4051.shutdown()
 
 if __name__ == "__main__":
     gui = Rin_4051_GUI()
@@ -11,9 +11,12 @@ Rin_FSV3004_CTStyle.py
 from __future__ import annotations
 import os
 import time
+import shutil
 import csv
 import threading
 import traceback
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Any, Dict
 import ctypes
 
@@ -26,10 +29,27 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog
+from tkinter import font as tkfont
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from io import StringIO
+from io import StringIO, BytesIO
 from PIL import Image, ImageTk
 
+# numba 可选：安装后 RIN dB 换算与积分走单次遍历的 JIT 融合内核，否则走 NumPy 向量化实现
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except Exception:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+# watchdog 可选：安装后等待数据文件同步改为目录事件唤醒，否则按固定间隔轮询
+try:
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except Exception:
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
 # 启用DPI感知，解决高DPI屏幕下界面模糊问题
 if os.name == 'nt':
     try:
@@ -54,6 +74,167 @@ def ensure_dir(path: str):
 def default_logger(msg: str):
     print(msg)
 
+def log_decimate(x, y, nbins=1000):
+    """按对数频率等分为 nbins 个桶，每桶保留最小/最大值包络，仅用于绘图"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.size <= 2 * nbins or x[0] <= 0:
+        return x, y
+    edges = np.logspace(np.log10(x[0]), np.log10(x[-1]), nbins + 1)
+    # 按连续相同桶号分组后用 reduceat 归约；段间频率重叠时只是多出几个分组
+    bins = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, nbins - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], x.size] - 1
+    xs = np.column_stack([x[starts], x[ends]]).ravel()
+    ys = np.column_stack([np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)]).ravel()
+    return xs, ys
+
+def render_figure_png(fig, dpi=300):
+    """在 Tk 主线程把 Figure 渲染为未压缩的 PNG 内存缓冲；Figure 与其画布只能在主线程访问"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight', pil_kwargs={'compress_level': 0})
+    buf.seek(0)
+    return buf
+
+def encode_rendered_image(buf, file_path, dpi=300):
+    """把 render_figure_png 的结果按目标格式压缩编码并写盘；只用 Pillow，可在后台线程执行"""
+    with Image.open(buf) as img:
+        if file_path.lower().endswith(('.jpg', '.jpeg')):
+            img = img.convert('RGB')
+        img.save(file_path, dpi=(dpi, dpi))
+
+# 弹窗按钮字体：首次打开弹窗（Tk 根窗口已存在）时创建一次，之后各弹窗共用
+_FONT_LARGE = None
+_FONT_MED = None
+
+def _init_fonts(master=None):
+    global _FONT_LARGE, _FONT_MED
+    if _FONT_LARGE is None:
+        _FONT_LARGE = tkfont.Font(root=master, family='SimHei', size=20)
+        _FONT_MED = tkfont.Font(root=master, family='SimHei', size=16)
+
+# 进程内共享的 ResourceManager：各分析器连接时复用，程序退出时统一关闭
+_RM = None
+_RM_LOCK = threading.Lock()
+
+def _get_rm():
+    global _RM
+    with _RM_LOCK:
+        if _RM is None:
+            _RM = pyvisa.ResourceManager()
+        return _RM
+
+def _close_rm():
+    global _RM
+    with _RM_LOCK:
+        if _RM is not None:
+            try:
+                _RM.close()
+            except Exception:
+                pass
+            _RM = None
+
+if NUMBA_AVAILABLE:
+    # 注意不开 fastmath：它假设不存在 inf/nan，会让 -inf 无效点的判断失效
+    @njit(cache=True)
+    def _rin_kernel(x, dy, denom, segment_length):
+        """一次遍历同时得到 RIN(dB) 曲线与每 segment_length 点的积分 RMS"""
+        n = dy.size
+        ddy = np.empty(n)
+        power = np.empty(n // segment_length)
+        integral = 0.0
+        prev = 0.0
+        k = 0
+        for i in range(n):
+            v = dy[i]
+            ratio = v / denom[i]
+            if v > 0:
+                r = 20.0 * np.log10(ratio)
+            else:
+                r = -np.inf
+            ddy[i] = r
+            # 10**(r/10) 恒等于 ratio**2，不再做一次 pow
+            cur = ratio * ratio if np.isfinite(r) else 0.0
+            if i > 0:
+                integral += (x[i] - x[i-1]) * (cur + prev) / 2.0
+            prev = cur
+            if (i + 1) % segment_length == 0:
+                power[k] = np.sqrt(integral)
+                k += 1
+        return ddy, power
+
+    def _warmup_numba_kernels():
+        """用极小数组调用一次内核，触发编译/加载缓存，避免首次处理数据时卡顿"""
+        try:
+            # 参数类型须与 process_files 的实际调用一致（dy 为 float32），否则首次处理仍会按新签名重新编译
+            x = np.arange(1.0, 13.0)
+            _rin_kernel(x, np.ones(12, dtype=np.float32), np.ones_like(x), 6)
+        except Exception:
+            pass
+
+def _file_ready(path: str) -> bool:
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+class _FileReadyWaiter:
+    """等待一组文件出现且大小>0。有 watchdog 时由目录事件唤醒，否则退化为轮询"""
+
+    def __init__(self, paths, poll_s=0.5):
+        self._events = {self._key(p): threading.Event() for p in paths}
+        self._poll_s = poll_s
+        self._observer = None
+        for p in paths:
+            self._check(p)
+        if WATCHDOG_AVAILABLE and paths:
+            try:
+                observer = Observer()
+                for d in {os.path.dirname(p) for p in paths}:
+                    if os.path.isdir(d):
+                        observer.schedule(self, d, recursive=False)
+                observer.start()
+                self._observer = observer
+            except Exception:
+                self._observer = None
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def _check(self, path):
+        ev = self._events.get(self._key(path))
+        if ev is not None and not ev.is_set() and _file_ready(path):
+            ev.set()
+
+    # watchdog 事件回调（created/modified/moved 都可能意味着文件已写入）
+    def dispatch(self, event):
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if path:
+                self._check(path)
+
+    def wait(self, path, timeout):
+        ev = self._events[self._key(path)]
+        deadline = time.monotonic() + timeout
+        # 有事件监视时以较长间隔兜底复查（网络共享目录可能丢事件），否则按 poll_s 轮询
+        interval = self._poll_s * 4 if self._observer is not None else self._poll_s
+        while not ev.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ev.wait(min(interval, remaining))
+            self._check(path)
+        return ev.is_set()
+
+    def close(self):
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=2)
+            except Exception:
+                pass
+            self._observer = None
+
 # -------------------------
 # RinAnalyzer (原样逻辑，增加 log_func 支持)
 # -------------------------
@@ -61,6 +242,9 @@ class RinAnalyzer:
     def __init__(self, log_func=default_logger):
         self.rm = None
         self.instrument = None
+        # 用于 MMEM:COPY 的 INSTR 会话，connect 时打开一次，各段复用
+        self._copy_instr = None
+        self._copy_resource = None
         self.dc_value = 1.20  # 默认DC值
         self.amplification = 14
         self.file_paths = [
@@ -71,12 +255,15 @@ class RinAnalyzer:
             'C:\\PTS\\zhongzi\\Rin\\FSV3004\\Rin_5.DAT',
             'C:\\PTS\\zhongzi\\Rin\\FSV3004\\Rin_6.DAT',
         ]
+        # 文件名(小写) -> 本地路径，按文件名精确查找保存位置
+        self._filename_to_path = {os.path.basename(p).lower(): p for p in self.file_paths}
 
+        # dx/dy 为各段曲线的 ndarray 列表；ddx/ddy/RIN_power 为拼接后的单个 ndarray
         self.dx = []
         self.dy = []
-        self.ddx = []
-        self.ddy = []
-        self.RIN_power = []
+        self.ddx = np.empty(0)
+        self.ddy = np.empty(0)
+        self.RIN_power = np.empty(0)
         self.stop_flag = False
         self.stop_window = None
 
@@ -85,32 +272,62 @@ class RinAnalyzer:
         # 等待文件同步的默认超时（秒）及轮询间隔
         self.file_wait_timeout_s = 30.0
         self.file_wait_poll_s = 0.5
+        # 直接以 REAL,32 二进制块读取曲线（不经仪器硬盘 + SMB 复制 + 文本解析）；失败时回退到文件复制
+        self.use_binary_transfer = True
+        # 二进制读取到的各段曲线：{文件名小写: (频率数组, 数值数组)}
+        self._traces = {}
+        # 主会话优先走 HiSLIP（带长度分帧，二进制块传输更快），不可用时回退到 5025 SOCKET
+        self.use_hislip = True
 
     # 连接仪器（保持原命令）
     def connect(self, ip_address="192.168.7.10", port=5025):
         try:
-            self.rm = pyvisa.ResourceManager()
-            # 使用 SOCKET 地址（与原脚本一致）
-            self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::{port}::SOCKET")
-            self.instrument.timeout = 60000
-            self.instrument.read_termination = '\n'
-            self.instrument.write_termination = '\n'
+            self.rm = _get_rm()
+            self.instrument = None
+            if self.use_hislip:
+                try:
+                    # HiSLIP 自带消息分帧，不需要设置读写终止符
+                    self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::hislip0")
+                    self.instrument.timeout = 60000
+                    self.log("已通过 HiSLIP 连接")
+                except Exception as e:
+                    self.instrument = None
+                    self.log(f"HiSLIP 连接失败，回退到 SOCKET: {e}")
+            if self.instrument is None:
+                # 使用 SOCKET 地址（与原脚本一致）
+                self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::{port}::SOCKET")
+                self.instrument.timeout = 60000
+                self.instrument.read_termination = '\n'
+                self.instrument.write_termination = '\n'
+            self._open_copy_session(ip_address)
             self.log("成功连接到频谱分析仪")
             return True
         except Exception as e:
             self.log(f"连接失败: {e}")
             return False
 
+    def _open_copy_session(self, ip_address):
+        """打开 MMEM:COPY 使用的 INSTR 会话；失败时留到首次复制再重试"""
+        self._copy_resource = f"TCPIP0::{ip_address}::inst0::INSTR"
+        try:
+            self._copy_instr = self.rm.open_resource(self._copy_resource)
+        except Exception as e:
+            self._copy_instr = None
+            self.log(f"复制会话打开失败，将在复制时重试: {e}")
+
+    def _copy_to_share(self, copy_cmd):
+        if self._copy_instr is None:
+            self._copy_instr = self.rm.open_resource(self._copy_resource)
+        self._copy_instr.write(copy_cmd)
+
     # 配置仪器（与原样）
     def configure_instrument(self):
         if not self.instrument:
             self.log("未连接到仪器")
             return
-        self.instrument.write(":INST:SEL SA") # 选择频谱分析仪
-        self.instrument.write(":CONF:SAN") # 配置频谱分析仪
-        self.instrument.write("SWE:POIN 2001") # 设置采样点数
-        self.instrument.write("UNIT:POW V") # 设置单位为伏特
-        self.instrument.write("TRACE1:TYPE AVERage") # 设置追踪类型为平均
+        # 选择频谱分析仪、配置频谱分析、2001 采样点、单位伏特、追踪类型平均：合并为一条复合命令
+        # （复合命令中每个头都以 ':' 开头，按根路径解析）
+        self.instrument.write(":INST:SEL SA;:CONF:SAN;:SWE:POIN 2001;:UNIT:POW V;:TRACE1:TYPE AVERage")
         self.log("仪器已配置（SWE:POIN 2001, UNIT: V, TRACE: AVERage）")
 
     # 测量函数（与原样）
@@ -119,15 +336,19 @@ class RinAnalyzer:
             self.log("未连接到仪器")
             return False
         try:
-            self.instrument.write(f":BAND {bandwidth}")
-            self.instrument.write(f":AVER:COUN {avg_count}")
-            self.instrument.write(f":FREQ:STAR {start_freq} Hz")
-            self.instrument.write(f":FREQ:STOP {stop_freq} Hz")
+            # 带宽/平均次数/起止频率一次写入，减少 TCP 往返
+            self.instrument.write(f":BAND {bandwidth};:AVER:COUN {avg_count};:FREQ:STAR {start_freq} Hz;:FREQ:STOP {stop_freq} Hz")
             self.instrument.query("*OPC?")
 
-            self.instrument.write(":INIT:CONT OFF")  # 关闭连续模式
-            self.instrument.write(":INIT")
+            self.instrument.write(":INIT:CONT OFF;:INIT")  # 关闭连续模式并启动单次扫描
             self.instrument.query("*OPC?")
+
+            if self.use_binary_transfer:
+                try:
+                    self._fetch_trace_binary(start_freq, stop_freq, filename)
+                    return True
+                except Exception as e:
+                    self.log(f"二进制读取曲线失败，改用文件复制: {e}")
             
             instrument_path = f"C:\\PTS\\Rin\\{filename}"
             self.instrument.write("MMEM:MDIR 'C:\\PTS\\Rin'")
@@ -137,14 +358,10 @@ class RinAnalyzer:
             self.instrument.query("*OPC?")
             self.log(f"数据已存储在仪器内部: {instrument_path}")
 
-            # 复制到共享目录（保留原逻辑）
-            instrument_ip = "192.168.7.10"
+            # 复制到共享目录（复用 connect 时打开的 INSTR 会话）
             source_path = "C:\\PTS\\Rin"
             dest_path = r"\\192.168.7.7\PTS\zhongzi\Rin\FSV3004"
-            rm = pyvisa.ResourceManager()
-            instr = rm.open_resource(f"TCPIP0::{instrument_ip}::inst0::INSTR")
-            instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
-            instr.close()
+            self._copy_to_share(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
             self.log(f"文件已从仪器复制到电脑共享文件夹：{dest_path}")
 
         except Exception as e:
@@ -152,6 +369,29 @@ class RinAnalyzer:
             return False
         return True
 
+    def _fetch_trace_binary(self, start_freq, stop_freq, filename):
+        """以二进制块读取 TRACE1，结果留在内存供 process_files 使用，并在本地另存一份两列文本"""
+        self.instrument.write(":FORM REAL,32")
+        try:
+            y = self.instrument.query_binary_values(":TRAC:DATA? TRACE1", datatype='f',
+                                                    container=np.ndarray)
+        finally:
+            self.instrument.write(":FORM ASC")
+        # 保持仪器传回的 float32，后续换算时再提升到 float64
+        y = y.astype(np.float32, copy=False)
+        x = np.linspace(float(start_freq), float(stop_freq), len(y))
+        self._traces[filename.lower()] = (x, y)
+        self.log(f"已读取曲线 {filename}: {len(y)} 点")
+
+        # 留档：按 频率;数值 两列写入本地数据文件，read_data_from_csv 仍可读取
+        local_path = self._filename_to_path.get(filename.lower())
+        if local_path:
+            try:
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                np.savetxt(local_path, np.column_stack((x, y)), fmt="%.9g", delimiter=";")
+            except Exception as e:
+                self.log(f"保存数据文件失败 {local_path}: {e}")
+
     def _parse_and_save_data(self, raw_data, filename):
         # 保留原解析逻辑（未改动核心解析）
         try:
@@ -169,7 +409,7 @@ class RinAnalyzer:
                 self.log(f"错误: 数据块为空，无法解析")
                 return
 
-            local_path = next((p for p in self.file_paths if filename.lower() in p.lower()), None)
+            local_path = self._filename_to_path.get(filename.lower())
             if not local_path:
                 self.log(f"未找到本地保存路径: {filename}")
                 return
@@ -187,7 +427,7 @@ class RinAnalyzer:
     def _parse_fallback_data(self, raw_data, filename):
         # 如果没有 # 标记，保留原始行为：尝试以文本方式保存
         try:
-            local_path = next((p for p in self.file_paths if filename.lower() in p.lower()), None)
+            local_path = self._filename_to_path.get(filename.lower())
             if not local_path:
                 self.log(f"_parse_fallback_data: 未找到本地保存路径: {filename}")
                 return
@@ -211,25 +451,23 @@ class RinAnalyzer:
             messagebox.showinfo("信息", "使用默认DC值.", parent=parent)
             self.dc_value = 1.20
 
-    # 读取 CSV 数据（保持原逻辑）
+    # 读取 CSV 数据：仍用 Sniffer 判定分隔符，数值解析交给 NumPy 一次完成
     def read_data_from_csv(self, file_path):
         try:
             with open(file_path, 'r') as f:
                 sample = f.read(1024)
                 f.seek(0)
                 dialect = csv.Sniffer().sniff(sample)
-                reader = csv.reader(f, dialect)
-
-                file_dx, file_dy = [], []
-                for row in reader:
-                    if len(row) >= 2:
-                        try:
-                            x = float(row[0])
-                            y = float(row[1])
-                            file_dx.append(x)
-                            file_dy.append(y)
-                        except ValueError:
-                            continue
+                # 列数不足的行直接跳过，非数值字段解析为 NaN，随后与原逻辑一样丢弃前两列不是数字的行
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    arr = np.genfromtxt(f, delimiter=dialect.delimiter, usecols=(0, 1),
+                                        dtype=np.float64, invalid_raise=False)
+            arr = arr.reshape(-1, 2)
+            arr = arr[~np.isnan(arr).any(axis=1)]
+            # 频率保留 float64；测量值与仪器 REAL,32 一致按 float32 存放，换算/积分时再提升到 float64
+            file_dx = arr[:, 0]
+            file_dy = arr[:, 1].astype(np.float32)
             if len(file_dy) != 2001:
                 self.log(f"警告: 数据点数非2001，实际 {len(file_dy)}")
             self.dx.append(file_dx)
@@ -243,108 +481,153 @@ class RinAnalyzer:
     def process_files(self):
         self.dx = []
         self.dy = []
-        self.ddx = []
-        self.ddy = []
-
-        for file_path in self.file_paths:
-            # 等待文件被复制/同步到本地（存在且大小>0）
-            waited = 0.0
-            file_ready = False
-            while waited < getattr(self, 'file_wait_timeout_s', 30.0):
-                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                    file_ready = True
-                    break
-                time.sleep(getattr(self, 'file_wait_poll_s', 0.5))
-                waited += getattr(self, 'file_wait_poll_s', 0.5)
-
-            if not file_ready:
-                self.log(f"文件不存在或未同步（等待{getattr(self,'file_wait_timeout_s',30.0)}s）: {file_path}")
-                # 保留原行为：把占位空列表加入以维持索引
-                self.dx.append([])
-                self.dy.append([])
-                continue
+        self.ddx = np.empty(0)
+        self.ddy = np.empty(0)
 
-            # 尝试读取文件，若失败则重试几次（读取可能因文件正在被写入而瞬时失败）
-            read_ok = False
-            read_attempts = 0
-            max_read_attempts = 3
-            while read_attempts < max_read_attempts and not read_ok:
-                try:
-                    if self.read_data_from_csv(file_path):
-                        self.log(f"成功读取: {file_path}")
-                        read_ok = True
-                        break
-                    else:
-                        self.log(f"读取失败（尝试{read_attempts+1}）: {file_path}")
-                except Exception as e:
-                    self.log(f"读取异常（尝试{read_attempts+1}）: {file_path} -> {e}")
-                read_attempts += 1
-                time.sleep(0.5)
+        # 已通过二进制读取的段直接使用内存数据；其余等待文件被复制/同步到本地（存在且大小>0）
+        pending = [p for p in self.file_paths if os.path.basename(p).lower() not in self._traces]
+        waiter = _FileReadyWaiter(pending, getattr(self, 'file_wait_poll_s', 0.5))
+        try:
+            for file_path in self.file_paths:
+                trace = self._traces.get(os.path.basename(file_path).lower())
+                if trace is not None:
+                    self.dx.append(trace[0])
+                    self.dy.append(trace[1])
+                    continue
+                if not waiter.wait(file_path, getattr(self, 'file_wait_timeout_s', 30.0)):
+                    self.log(f"文件不存在或未同步（等待{getattr(self,'file_wait_timeout_s',30.0)}s）: {file_path}")
+                    # 保留原行为：加入空数组占位以维持索引
+                    self.dx.append(np.empty(0))
+                    self.dy.append(np.empty(0, dtype=np.float32))
+                    continue
 
-            if not read_ok:
-                self.log(f"最终读取失败: {file_path}")
-                self.dx.append([])
-                self.dy.append([])
+                # 尝试读取文件，若失败则重试几次（读取可能因文件正在被写入而瞬时失败）
+                read_ok = False
+                read_attempts = 0
+                max_read_attempts = 3
+                while read_attempts < max_read_attempts and not read_ok:
+                    try:
+                        if self.read_data_from_csv(file_path):
+                            self.log(f"成功读取: {file_path}")
+                            read_ok = True
+                            break
+                        else:
+                            self.log(f"读取失败（尝试{read_attempts+1}）: {file_path}")
+                    except Exception as e:
+                        self.log(f"读取异常（尝试{read_attempts+1}）: {file_path} -> {e}")
+                    read_attempts += 1
+                    time.sleep(0.5)
+
+                if not read_ok:
+                    self.log(f"最终读取失败: {file_path}")
+                    self.dx.append(np.empty(0))
+                    self.dy.append(np.empty(0, dtype=np.float32))
+        finally:
+            waiter.close()
 
         rows_per_file = 2001
+        ddx_parts, dy_parts, denom_parts = [], [], []
         for j in range(len(self.dx)):
-            if not self.dx[j]:
+            if self.dx[j].size == 0:
                 self.log(f"文件{j}数据为空，跳过处理")
                 continue
 
             if len(self.dy[j]) != rows_per_file:
                 self.log(f"警告: 文件{j}数据点不足，期望{rows_per_file}个，实际 {len(self.dy[j])}")
 
-            for i in range(min(rows_per_file, len(self.dx[j]))):
-                self.ddx.append(self.dx[j][i])
-                scale_factor = np.sqrt(5) if j < 2 else np.sqrt(30)
-                v_noise = self.dy[j][i]
-                if v_noise <= 0:
-                    self.ddy.append(float('-inf'))  # 无效数据填充为 -inf
-                else:
-                    rin_value = 20 * np.log10(v_noise / (self.dc_value * self.amplification * scale_factor))
-                    self.ddy.append(rin_value)
+            n = min(rows_per_file, len(self.dx[j]))
+            scale_factor = np.sqrt(5) if j < 2 else np.sqrt(30)
+            # 各段已是 ndarray，切片为视图，拼接时只复制一次
+            ddx_parts.append(self.dx[j][:n])
+            dy_parts.append(self.dy[j][:n])
+            denom_parts.append(np.full(n, self.dc_value * self.amplification * scale_factor))
+
+        if ddx_parts:
+            self.ddx = np.concatenate(ddx_parts)
+            dy_all = np.concatenate(dy_parts)
+            denom_all = np.concatenate(denom_parts)
+            if NUMBA_AVAILABLE:
+                # dB 换算与积分在同一内核里一次遍历完成
+                self.ddy, self.RIN_power = _rin_kernel(self.ddx, dy_all, denom_all, 6)
+                return
+            # 向量化换算 dB，非正值（无效数据）填充为 -inf
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                ratio = dy_all / denom_all
+                rin = 20 * np.log10(ratio)
+                self.ddy = np.where(dy_all > 0, rin, -np.inf)
+                # 10**(rin/10) 恒等于 ratio**2，积分直接用线性值，省去一次 log10 -> pow 的往返
+                y_lin = np.where(np.isfinite(self.ddy), ratio * ratio, 0.0)
+            self.RIN_power = self._cumulative_rms(self.ddx, y_lin)
+            return
 
-        if self.ddx and self.ddy:
-            self.RIN_power = self.compute_rin_power(self.ddx, self.ddy)
-        else:
-            self.log("错误: 无有效数据可处理")
-            self.RIN_power = []
+        self.log("错误: 无有效数据可处理")
+        self.RIN_power = np.empty(0)
 
-    # compute_rin_power 保持原实现
+    # compute_rin_power：每 6 个点输出一次从起点开始的梯形积分开方值（结果与原逐段累加实现一致）
     def compute_rin_power(self, x, y):
-        power = []
-        segment_length = 6
-        for k in range(1, len(x) // segment_length + 1):
-            sub_x = x[:k*segment_length]
-            sub_y_exp = [np.power(10, val / 10.0) if np.isfinite(val) else 0 for val in y[:k*segment_length]]
-            integral = sum((sub_x[i] - sub_x[i-1]) * (sub_y_exp[i] + sub_y_exp[i-1]) / 2.0
-                           for i in range(1, len(sub_x)))
-            power.append(np.sqrt(integral))
-        return power
+        y = np.asarray(y, dtype=np.float64)
+        # 只做一次 dB -> 线性换算
+        y_exp = np.where(np.isfinite(y), np.power(10.0, y / 10.0), 0.0)
+        return self._cumulative_rms(x, y_exp)
+
+    @staticmethod
+    def _cumulative_rms(x, y_exp, segment_length=6):
+        """一次累积梯形积分（cum[i] 为 x[0]..x[i] 的积分），每 segment_length 点取一次开方"""
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) < segment_length:
+            return np.empty(0)
+        trap = np.diff(x) * (y_exp[1:] + y_exp[:-1]) / 2.0
+        cum = np.concatenate(([0.0], np.cumsum(trap)))
+        idx = np.arange(segment_length, len(x) + 1, segment_length) - 1
+        return np.sqrt(cum[idx])
 
     # visualize_data 完整保留（仅把 print 改为 self.log）
     def visualize_data(self):
-        if not self.ddx or not self.ddy or not self.RIN_power:
+        if self.ddx.size == 0 or self.ddy.size == 0 or self.RIN_power.size == 0:
             self.log("没有可视化的数据")
             return
         root = tk.Toplevel()
         root.title("测Rin数据可视化")
+        _init_fonts(root)
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [3, 2]})
 
+        # 自动保存完成后记录 Rin.png 路径；用户再保存 PNG 时直接复制该文件，不再重新渲染
+        # 只有 done 置位（后台写盘已成功结束）后才使用缓存文件，未完成时直接重新渲染保存
+        auto_saved = {"done": threading.Event()}
+
         def save_figure():
             file_path = filedialog.asksaveasfilename(defaultextension=".png",filetypes=[("PNG files", "*.png"),("JPEG files", "*.jpg"),("All files", "*.*")])
             if file_path:
-                fig.savefig(file_path, dpi=300, bbox_inches='tight')
+                is_png = file_path.lower().endswith(".png")
+                cached = auto_saved.get("path") if auto_saved["done"].is_set() else None
+                # 窗口缩放会改变 Figure 的英寸尺寸，只有尺寸未变时自动保存的文件才与当前渲染结果一致
+                same_size = np.allclose(fig.get_size_inches(), auto_saved.get("size_inches", (0, 0)))
+                if is_png and cached and same_size and os.path.isfile(cached):
+                    shutil.copyfile(cached, file_path)
+                elif is_png:
+                    # 主线程按当前尺寸重新渲染，后台线程只做 PNG 压缩编码与写盘
+                    buf = render_figure_png(fig)
+
+                    def _save_png():
+                        try:
+                            encode_rendered_image(buf, file_path)
+                            root.after(0, lambda: messagebox.showinfo("成功", f"图像已保存到 {file_path}", parent=root))
+                        except Exception as e:
+                            root.after(0, lambda e=e: messagebox.showerror("保存失败", f"保存图像时出错: {e}", parent=root))
+                    threading.Thread(target=_save_png, daemon=True).start()
+                    return
+                else:
+                    fig.savefig(file_path, dpi=300, bbox_inches='tight')
                 messagebox.showinfo("成功", f"图像已保存到 {file_path}")
         # 创建一个框架用于放置顶部按钮
         top_frame = tk.Frame(root)
         top_frame.pack(side=tk.TOP, fill=tk.X, pady=10)
         # 在框架中间放置保存按钮
-        tk.Button(top_frame, text="保存", command=save_figure, font=('SimHei', 20)).pack(side=tk.TOP)
+        tk.Button(top_frame, text="保存", command=save_figure, font=_FONT_LARGE).pack(side=tk.TOP)
 
         """图1: RIN曲线"""
-        ax1.plot(self.ddx, self.ddy, color="#085cab", linewidth=2) # 曲线
+        # 对数轴上低频端大量点落在同一像素内，按对数桶保留最小/最大包络后再绘制（峰值不丢失）
+        ax1.plot(*log_decimate(self.ddx, self.ddy), color="#085cab", linewidth=2) # 曲线
         ax1.set_xscale('log')
         ax1.margins(x=0) # 边距
         ax1.tick_params(axis='both', which='major', labelsize=20, pad=5, length=12, width=3, direction='in') # 刻度线
@@ -360,12 +643,12 @@ class RinAnalyzer:
             label.set_fontsize(20)
             label.set_fontweight('bold')
         # 设置x轴范围
-        finite_ddy = [v for v in self.ddy if np.isfinite(v)]
-        if finite_ddy:
-            ax1.set_ylim(np.floor(min(finite_ddy)/10)*10, np.ceil(max(finite_ddy)/10)*10)
+        finite_ddy = self.ddy[np.isfinite(self.ddy)]
+        if finite_ddy.size:
+            ax1.set_ylim(np.floor(finite_ddy.min()/10)*10, np.ceil(finite_ddy.max()/10)*10)
         ax1.yaxis.set_major_locator(MaxNLocator(nbins=6, integer=True))
         # 设置x轴主刻度
-        adjusted_power = [p * 100 for p in self.RIN_power]
+        adjusted_power = self.RIN_power * 100
 
         """图2: RMS积分曲线"""
         ax2.plot(self.ddx[::6], adjusted_power, color="#085cab", linewidth=2)
@@ -424,23 +707,33 @@ class RinAnalyzer:
             except Exception:
                 w_px = h_px = 0
 
-            # 使用固定的 DPI=300 进行保存，与手动保存保持一致
-            try:
-                fig.savefig(auto_path, dpi=300, bbox_inches='tight')
-                self.log(f"[保存] 自动保存Rin图片: {auto_path}")
-            except Exception as e:
-                self.log(f"[保存] 自动保存Rin图片失败: {e}")
+            # 使用固定的 DPI=300 进行保存，与手动保存保持一致；渲染在主线程完成（savefig 会临时改 dpi 并重排版，
+            # 不能与窗口缩放/重绘并发），后台线程只做 PNG 压缩编码与写盘
+            buf = render_figure_png(fig)
+            # 记录渲染时的 Figure 尺寸，手动保存时据此判断缓存文件是否仍可直接复制
+            auto_saved["size_inches"] = tuple(fig.get_size_inches())
+
+            def _auto_save():
+                try:
+                    encode_rendered_image(buf, auto_path)
+                    auto_saved["path"] = auto_path
+                    auto_saved["done"].set()
+                    self.log(f"[保存] 自动保存Rin图片: {auto_path}")
+                except Exception as e:
+                    self.log(f"[保存] 自动保存Rin图片失败: {e}")
+            threading.Thread(target=_auto_save, daemon=True).start()
         except Exception as e:
             self.log(f"[保存] 生成自动保存路径失败: {e}")
 
-        target_xs = [1000, 10000, 100000, 1000000]
+        target_xs = np.array([1000, 10000, 100000, 1000000], dtype=np.float64)
 
         # 1. 修改检测范围为 1e5 到 1e7 Hz
         relax_start = 1e5
         relax_stop = 1e7
 
-        freqs = np.array(self.ddx)
-        ys = np.array(self.ddy)
+        # ddx/ddy 已是 ndarray，峰值搜索与下方指定频点取值共用同一份数组，不再复制
+        freqs = self.ddx
+        ys = self.ddy
         
         # 筛选出范围内的有效数据
         mask = (freqs >= relax_start) & (freqs <= relax_stop) & np.isfinite(ys)
@@ -484,12 +777,20 @@ class RinAnalyzer:
 
         # 拼接弹窗文本（显示峰值及若干指定频点的值）
         result_text = f"驰豫振荡峰 ({int(relax_start):d} - {int(relax_stop):d} Hz): {highest_rin:.3f} dBc/Hz @ {peak_freq:.0f} Hz\n\n"
-        for tx in target_xs:
-            if len(self.ddx) == 0:
-                continue
-            idx = np.argmin(np.abs(np.array(self.ddx) - tx))
-            x_val = self.ddx[idx]
-            y_val = self.ddy[idx]
+        if len(freqs) == 0:
+            idxs = np.empty(0, dtype=np.intp)
+        elif np.all(freqs[1:] >= freqs[:-1]):
+            # 各段按频率递增拼接，ddx 单调不减，可用二分查找一次定位所有目标点
+            right = np.clip(np.searchsorted(freqs, target_xs), 0, len(freqs) - 1)
+            left = np.clip(right - 1, 0, len(freqs) - 1)
+            # 取左右相邻点中更近的一个（距离相同取左侧，与 argmin 取首个一致）
+            idxs = np.where(np.abs(freqs[left] - target_xs) <= np.abs(freqs[right] - target_xs), left, right)
+        else:
+            # 段顺序被改动导致 ddx 非单调时，广播一次算出所有目标点的最近索引
+            idxs = np.abs(freqs[:, None] - target_xs[None, :]).argmin(axis=0)
+        for idx in idxs:
+            x_val = freqs[idx]
+            y_val = ys[idx]
             # 处理无效值显示
             if not np.isfinite(y_val):
                 result_text += f"x={x_val:.0f} Hz 时, y=无效数据\n"
@@ -504,16 +805,18 @@ class RinAnalyzer:
         self.stop_flag = True
 
     def close(self):
-        if self.instrument:
+        if self._copy_instr:
             try:
-                self.instrument.close()
+                self._copy_instr.close()
             except Exception:
                 pass
-        if self.rm:
+            self._copy_instr = None
+        if self.instrument:
             try:
-                self.rm.close()
+                self.instrument.close()
             except Exception:
                 pass
+        # ResourceManager 为进程内共享，这里只关闭本实例的会话
         self.log("已关闭仪器连接")
 
 
@@ -524,41 +827,60 @@ class BackgroundNoiseAnalyzer:
     def __init__(self, log_func=default_logger):
         self.rm = None
         self.instrument = None
+        self._copy_instr = None
+        self._copy_resource = None
         self.log = log_func
 
     def connect(self, ip_address="192.168.7.10", port=5025):
         try:
-            self.rm = pyvisa.ResourceManager()
+            self.rm = _get_rm()
             self.instrument = self.rm.open_resource(f"TCPIP0::{ip_address}::{port}::SOCKET")
             self.instrument.timeout = 60000
             self.instrument.read_termination = '\n'
             self.instrument.write_termination = '\n'
+            self._open_copy_session(ip_address)
             self.log("成功连接到频谱分析仪")
             return True
         except Exception as e:
             self.log(f"连接失败: {e}")
             return False
 
+    def _open_copy_session(self, ip_address):
+        """打开 MMEM:COPY 使用的 INSTR 会话；失败时留到首次复制再重试"""
+        self._copy_resource = f"TCPIP0::{ip_address}::inst0::INSTR"
+        try:
+            self._copy_instr = self.rm.open_resource(self._copy_resource)
+        except Exception as e:
+            self._copy_instr = None
+            self.log(f"复制会话打开失败，将在复制时重试: {e}")
+
+    def _copy_to_share(self, copy_cmd):
+        if self._copy_instr is None:
+            self._copy_instr = self.rm.open_resource(self._copy_resource)
+        self._copy_instr.write(copy_cmd)
+
+    def close(self):
+        # ResourceManager 为进程内共享，这里只关闭本实例的会话
+        for sess in (self._copy_instr, self.instrument):
+            if sess:
+                try:
+                    sess.close()
+                except Exception:
+                    pass
+        self._copy_instr = None
+
     def measure_and_screenshot(self, start_freq=10, stop_freq=100_000_000, bandwidth=30, avg_count=1, screenshot_name="BackgroundNoise_Screen.png", dat_filename="BackgroundNoise.DAT", is_seedlight=False):
         if not self.instrument:
             self.log("未连接到仪器")
             return False
         try:
             # 配置参数
-            self.instrument.write(":INST:SEL SA")
-            self.instrument.write(":CONF:SAN")
-            self.instrument.write("SWE:POIN 2001")
-            self.instrument.write("UNIT:POW V")
-            self.instrument.write("TRACE1:TYPE AVERage")
-            self.instrument.write(f":BAND {bandwidth}")
-            self.instrument.write(f":AVER:COUN {avg_count}")
-            self.instrument.write(f":FREQ:STAR {start_freq} Hz")
-            self.instrument.write(f":FREQ:STOP {stop_freq} Hz")
+            self.instrument.write(":INST:SEL SA;:CONF:SAN;:SWE:POIN 2001;:UNIT:POW V;:TRACE1:TYPE AVERage")
+            self.instrument.write(f":BAND {bandwidth};:AVER:COUN {avg_count};:FREQ:STAR {start_freq} Hz;:FREQ:STOP {stop_freq} Hz")
             self.instrument.query("*OPC?")
 
             # 启动测量
-            self.instrument.write(":INIT:CONT OFF")  # 关闭连续模式
-            self.instrument.write(":INIT")
+            self.instrument.write(":INIT:CONT OFF;:INIT")  # 关闭连续模式并启动单次扫描
             self.instrument.query("*OPC?")
             
             # 根据类型显示不同的日志
@@ -588,14 +910,10 @@ class BackgroundNoiseAnalyzer:
             self.log("仪器已截图并保存。")
 
             # 复制到共享目录（按 Rin 的简化实现：一次性复制整个仪器目录到目标）
-            instrument_ip = "192.168.7.10"
             source_path = "C:\\PTS\\Rin"
             dest_path = r"\\192.168.7.7\PTS\zhongzi\Rin\FSV3004"
-            rm = pyvisa.ResourceManager()
-            instr = rm.open_resource(f"TCPIP0::{instrument_ip}::inst0::INSTR")
             # 使用通配符一次性复制（与 Rin 的实现保持一致，注意：健壮性较低，但与用户要求一致）
-            instr.write(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
-            instr.close()
+            self._copy_to_share(f"MMEM:COPY '{source_path}\\*.*','{dest_path}'")
             self.log(f"文件已从仪器复制到电脑共享文件夹：{dest_path}")
 
             # 直接尝试显示截图（不等待文件同步，行为与 Rin 保持一致）
@@ -613,6 +931,7 @@ class BackgroundNoiseAnalyzer:
         local_dat_path = os.path.join(dest_path, dat_filename)
         
         win = tk.Toplevel()  # 不要用Tk()
+        _init_fonts(win)
         # 根据类型设置窗口标题
         if is_seedlight:
             win.title("种子光仪器截图")
@@ -651,7 +970,6 @@ class BackgroundNoiseAnalyzer:
             if save_path:
                 try:
                     # 复制文件
-                    import shutil
                     shutil.copy2(local_dat_path, save_path)
                     messagebox.showinfo("成功", f"数据已保存到 {save_path}")
                 except Exception as e:
@@ -662,9 +980,9 @@ class BackgroundNoiseAnalyzer:
         btn_frame.pack(side=tk.TOP)
         
         # 保存图片按钮
-        tk.Button(btn_frame, text="保存图片", command=save_image, font=('SimHei', 16)).pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="保存图片", command=save_image, font=_FONT_MED).pack(side=tk.LEFT, padx=10)
         # 保存数据按钮
-        tk.Button(btn_frame, text="保存数据", command=save_data, font=('SimHei', 16)).pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="保存数据", command=save_data, font=_FONT_MED).pack(side=tk.LEFT, padx=10)
         
         # 等待图片文件同步到本机（最多等待 timeout 秒）
         timeout = 10.0  # seconds
@@ -682,7 +1000,9 @@ class BackgroundNoiseAnalyzer:
         else:
             try:
                 img = Image.open(local_img_path)
-                img = img.resize((800, 600))
+                # JPEG 可在解码阶段先按 DCT 缩放（draft，对 PNG 无影响），再用 BOX 滤波缩到预览尺寸
+                img.draft('RGB', (800, 600))
+                img = img.resize((800, 600), Image.BOX)
                 photo = ImageTk.PhotoImage(img, master=win)
                 label = tk.Label(win, image=photo)
                 label.image = photo  # 防止被回收
@@ -714,37 +1034,37 @@ class TestRunner:
                 # 电脑共享目录
                 local_dir = r"\\192.168.7.7\\PTS\\zhongzi\\Rin\\FSV3004"
                 if os.path.exists(local_dir):
-                    for f in os.listdir(local_dir):
-                        fp = os.path.join(local_dir, f)
+                    # scandir 的目录项自带类型信息，省去逐个 stat；删除操作并发执行以重叠 SMB 往返
+                    with os.scandir(local_dir) as it:
+                        entries = list(it)
+
+                    def _remove(entry):
                         try:
-                            if os.path.isfile(fp) or os.path.islink(fp):
-                                os.remove(fp)
-                            elif os.path.isdir(fp):
-                                import shutil
-                                shutil.rmtree(fp)
+                            if entry.is_dir(follow_symlinks=False):
+                                shutil.rmtree(entry.path)
+                            else:
+                                os.remove(entry.path)
                         except Exception as e:
-                            self.log(f"[警告] 删除 {fp} 失败: {e}")
+                            self.log(f"[警告] 删除 {entry.path} 失败: {e}")
 
-                # 仪器目录清空
-                try:
-                    ip = "192.168.7.10"
-                    rm = pyvisa.ResourceManager()
-                    inst = rm.open_resource(f"TCPIP0::{ip}::5025::SOCKET")
-                    inst.write("MMEM:MDIR 'C:\\PTS\\Rin'")  # 确保路径存在
-                    inst.write("MMEM:DEL 'C:\\PTS\\Rin\\*.*'")
-                    #inst.query("*OPC?")
-                    inst.close()
-                    rm.close()
-                except Exception as e:
-                    self.log(f"[警告] 仪器文件夹清理失败: {e}")
+                    if entries:
+                        with ThreadPoolExecutor(max_workers=8) as ex:
+                            list(ex.map(_remove, entries))
 
-                self.log("[初始化] 文件夹清理完成。")
+                self.log("[初始化] 共享文件夹清理完成。")
             except Exception as e:
                 self.log(f"[错误] 清理文件夹时出错: {e}")
             ra.ui_root = ui_root
             ra.log = self.log  # route analyzer logs to gui
 
             if ra.connect():
+                # 仪器目录清空：直接复用测量会话，不再单独建立一条连接
+                try:
+                    ra.instrument.write("MMEM:MDIR 'C:\\PTS\\Rin'")  # 确保路径存在
+                    ra.instrument.write("MMEM:DEL 'C:\\PTS\\Rin\\*.*'")
+                    self.log("[初始化] 仪器内部文件夹清理完成。")
+                except Exception as e:
+                    self.log(f"[警告] 仪器文件夹清理失败: {e}")
                 ra.configure_instrument()
                 measurement_params = [
                     (10, 100, 5, 20, "Rin_1.DAT"),
@@ -768,31 +1088,34 @@ class TestRunner:
             else:
                 self.log("[测试] 无法连接到仪器，RIN 测试终止")
 
-            if self._stop or ra.stop_flag:
-                # 如果停止，更新 UI stop_window
-                def _notify_stopped():
-                    if ra.stop_window and ra.stop_window.winfo_exists():
+            # 本方法运行在工作线程，所有 Tk 操作都经 after 投递到主线程执行
+            def _close_stop_window():
+                if ra.stop_window and ra.stop_window.winfo_exists():
+                    try:
                         ra.stop_window.destroy()
-                        ra.stop_window = None
-                try:
-                    ra.ui_root.after(0, _notify_stopped)
-                except Exception:
-                    pass
-                return
-
-            # 原脚本会在这里处理文件与可视化
-            if ra.stop_window and ra.stop_window.winfo_exists():
-                try:
-                    ra.stop_window.destroy()
-                except Exception:
-                    pass
+                    except Exception:
+                        pass
                 ra.stop_window = None
+            try:
+                ra.ui_root.after(0, _close_stop_window)
+            except Exception:
+                pass
 
+            if self._stop or ra.stop_flag:
+                return
+
+            # 原脚本会在这里处理文件与可视化：数据处理留在工作线程，绘图窗口在主线程创建
             self.log("正在处理数据...")
             ra.process_files()
             self.log("正在显示可视化结果...")
-            ra.visualize_data()
-            self.log("程序执行完毕")
+
+            def _show_results():
+                try:
+                    ra.visualize_data()
+                    self.log("程序执行完毕")
+                except Exception as e:
+                    self.log(f"[Runner Exception] {e}\n{traceback.format_exc()}")
+            ra.ui_root.after(0, _show_results)
 
         except Exception as e:
             self.log(f"[Runner Exception] {e}\n{traceback.format_exc()}")
@@ -812,16 +1135,9 @@ class TestRunner:
                 bna.measure_and_screenshot(screenshot_name=screenshot_name, 
                                           dat_filename=dat_filename, 
                                           is_seedlight=is_seedlight)
-                try:
-                    bna.instrument.close()
-                except Exception:
-                    pass
-                try:
-                    bna.rm.close()
-                except Exception:
-                    pass
+                bna.close()
             else:
-                messagebox.showerror("错误", "无法连接到仪器")
+                ui_root.after(0, lambda: messagebox.showerror("错误", "无法连接到仪器"))
         except Exception as e:
             self.log(f"[Background Exception] {e}\n{traceback.format_exc()}")
 
@@ -829,6 +1145,11 @@ class TestRunner:
 # GUI: CT 风格（参数区 + 日志区）
 # -------------------------
 class RinGUI:
+    # 日志框最多保留的行数，超出部分在每次批量写入后一次性删除
+    LOG_MAX_LINES = 2000
+    # 改名关键字（小写）与对应中文名，按顺序取第一个匹配
+    _RENAME_KEYWORDS = (('background', '底噪'), ('seed', '种子光'))
+
     def __init__(self, parent=None):
         self.parent = parent
         
@@ -856,12 +1177,25 @@ class RinGUI:
             "dc_initial": 2.40
         }
         self.entries: Dict[str, tk.Entry] = {}
+        # 参数输入框绑定的 StringVar，以及随输入实时更新的去空白缓存（读取参数时不再访问控件）
+        self.vars: Dict[str, tk.StringVar] = {}
+        self._param_cache: Dict[str, str] = {}
+        # 日志先进缓冲区，由主线程定时器批量写入日志框（工作线程也会调用 log）
+        self._log_buf: List[str] = []
+        self._log_lock = threading.Lock()
+        self._log_flush_scheduled = False
+        self._log_last_sec = -1
+        self._log_last_tstr = ""
         self.runner = TestRunner(log_func=self.log)
         self.worker_thread: Optional[threading.Thread] = None
         self.running_task: Optional[str] = None
 
         self.create_widgets()
 
+        # 后台预编译 numba 内核，与用户填写参数、测量的时间重叠
+        if NUMBA_AVAILABLE:
+            threading.Thread(target=_warmup_numba_kernels, daemon=True).start()
+
     def set_center(self, width: int, height: int):
         screenwidth = self.root.winfo_screenwidth()
         screenheight = self.root.winfo_screenheight()
@@ -870,6 +1204,10 @@ class RinGUI:
         self.root.geometry(f'{width}x{height}+{posx}+{posy}')
 
     def create_widgets(self):
+        # 独立模式下先隐藏窗口，全部控件布置完成后一次性计算几何再显示
+        standalone = isinstance(self.root, tk.Tk)
+        if standalone:
+            self.root.withdraw()
         # 创建主容器，使用grid布局
         main_container = tk.Frame(self.root)
         main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -912,29 +1250,19 @@ class RinGUI:
         self.btn_stop = tk.Button(second_row_frame, text="停止", command=self.stop_running, bg="#f44336", fg="#FFFFFF", width=10)
         self.btn_rename = tk.Button(second_row_frame, text="改名", command=self.rename_files, bg="#FF9800", fg="#FFFFFF", width=10)
         
-        # 排列按钮
-        # 第一行按钮居中
-        first_row_spacer = tk.Label(first_row_frame)
-        first_row_spacer.pack(side=tk.LEFT, expand=True)  # 左侧填充
-        self.btn_rin.pack(side=tk.LEFT, padx=6)
-        self.btn_bg.pack(side=tk.LEFT, padx=6)
-        self.btn_seed.pack(side=tk.LEFT, padx=6)
-        first_row_spacer2 = tk.Label(first_row_frame)
-        first_row_spacer2.pack(side=tk.LEFT, expand=True)  # 右侧填充
-        
-        # 第二行按钮居中
-        second_row_spacer = tk.Label(second_row_frame)
-        second_row_spacer.pack(side=tk.LEFT, expand=True)  # 左侧填充
-        self.btn_connect.pack(side=tk.LEFT, padx=6)
-        self.btn_stop.pack(side=tk.LEFT, padx=6)
-        self.btn_rename.pack(side=tk.LEFT, padx=6)
-        second_row_spacer2 = tk.Label(second_row_frame)
-        second_row_spacer2.pack(side=tk.LEFT, expand=True)  # 右侧填充
+        # 排列按钮：每行按钮放在第 1~3 列，两侧空列按权重分配剩余宽度实现居中（无需占位 Label）
+        for row_frame, buttons in ((first_row_frame, (self.btn_rin, self.btn_bg, self.btn_seed)),
+                                   (second_row_frame, (self.btn_connect, self.btn_stop, self.btn_rename))):
+            row_frame.grid_columnconfigure(0, weight=1)
+            row_frame.grid_columnconfigure(len(buttons) + 1, weight=1)
+            for col, btn in enumerate(buttons, start=1):
+                btn.grid(row=0, column=col, padx=6)
 
         # --- 日志显示区域 - 右侧 --- 占据整个右侧区域
         log_frame = tk.LabelFrame(main_container, text="运行日志", padx=5, pady=5)
         log_frame.grid(row=0, column=1, sticky="nsew", padx=(5, 0))
-        self.log_box = tk.Text(log_frame, wrap=tk.WORD)
+        # 日志框只读：关闭撤销记录，平时 DISABLED，仅在批量写入时临时切换为 NORMAL
+        self.log_box = tk.Text(log_frame, wrap=tk.WORD, undo=False, maxundo=0, autoseparators=False, state=tk.DISABLED)
         self.log_box.pack(fill=tk.BOTH, expand=True)
         
         # 设置grid权重，确保参数设置列固定，日志框列可以扩展
@@ -942,12 +1270,19 @@ class RinGUI:
         main_container.grid_columnconfigure(1, weight=1)  # 日志框列可以扩展
         main_container.grid_rowconfigure(0, weight=1)     # 第一行可以扩展
 
+        if standalone:
+            self.root.update_idletasks()
+            self.root.deiconify()
+
     def _add_param_entry(self, parent, key, label, default="", row=0, browse=None):
         tk.Label(parent, text=label, anchor="e", width=10).grid(row=row, column=0, sticky="e", padx=4, pady=4)
-        ent = tk.Entry(parent, width=24)
-        ent.insert(0, str(default))
+        var = tk.StringVar(master=parent, value=str(default))
+        ent = tk.Entry(parent, width=24, textvariable=var)
         ent.grid(row=row, column=1, padx=4, pady=4)
         self.entries[key] = ent
+        self.vars[key] = var
+        self._param_cache[key] = str(default).strip()
+        var.trace_add("write", lambda *_, k=key, v=var: self._param_cache.__setitem__(k, v.get().strip()))
         if browse == "file":
             tk.Button(parent, text="浏览", command=lambda k=key: self.browse_file(k)).grid(row=row, column=2, padx=4, pady=4)
         if browse == "dir":
@@ -955,22 +1290,56 @@ class RinGUI:
         return ent
 
     def log(self, msg: str):
-        t = time.strftime("[%H:%M:%S]")
+        sec = int(time.time())
+        with self._log_lock:
+            # 同一秒内的日志复用已格式化的时间戳，只在秒数变化时调用 strftime
+            if sec != self._log_last_sec:
+                self._log_last_sec = sec
+                self._log_last_tstr = time.strftime("[%H:%M:%S]", time.localtime(sec))
+            t = self._log_last_tstr
+            self._log_buf.append(f"{t} {msg}\n")
+            schedule = not self._log_flush_scheduled
+            self._log_flush_scheduled = True
+        if schedule:
+            # 50ms 内的日志合并为一次插入，不再每条都 update_idletasks
+            try:
+                self.root.after(50, self._flush_log)
+            except Exception:
+                with self._log_lock:
+                    self._log_flush_scheduled = False
+        # 也打印到 stdout，方便日志文件或控制台查看
+        print(f"{t} {msg}")
+
+    def _flush_log(self):
+        with self._log_lock:
+            buf, self._log_buf = self._log_buf, []
+            self._log_flush_scheduled = False
+        if not buf:
+            return
         try:
-            self.log_box.insert(tk.END, f"{t} {msg}\n")
+            self.log_box.config(state=tk.NORMAL)
+            self.log_box.insert(tk.END, "".join(buf))
+            lines = int(self.log_box.index('end-1c').split('.')[0])
+            if lines > self.LOG_MAX_LINES:
+                self.log_box.delete('1.0', f'{lines - self.LOG_MAX_LINES + 1}.0')
+            self.log_box.config(state=tk.DISABLED)
             self.log_box.see(tk.END)
-            self.root.update_idletasks()
         except Exception:
             pass
-        # 也打印到 stdout，方便日志文件或控制台查看
-        print(f"{t} {msg}")
+
+    def _set_buttons(self, running: bool):
+        """任务开始/结束时统一切换按钮状态；只在主线程调用（工作线程经 after 投递）"""
+        task_state = tk.DISABLED if running else tk.NORMAL
+        for btn in (self.btn_rin, self.btn_bg, self.btn_seed, self.btn_connect):
+            btn.config(state=task_state)
+        self.btn_stop.config(state=tk.NORMAL if running else tk.DISABLED)
 
     def get_params(self) -> Dict[str, Any]:
         p = {}
         try:
-            p["osa_ip"] = self.entries["osa_ip"].get().strip()
-            #p["osa_port"] = int(self.entries["osa_port"].get().strip())
-            p["save_path"] = self.entries["save_path"].get().strip() or self.params["save_path"]
+            p["osa_ip"] = self._param_cache["osa_ip"]
+            #p["osa_port"] = int(self._param_cache["osa_port"])
+            p["save_path"] = self._param_cache["save_path"] or self.params["save_path"]
         except Exception:
             p = self.params.copy()
         return p
@@ -979,19 +1348,16 @@ class RinGUI:
         if messagebox.askyesno("选择", "选择保存目录？(否 = 选择具体文件名)"):
             dirname = filedialog.askdirectory(title="选择保存目录")
             if dirname:
-                self.entries[param_key].delete(0, tk.END)
-                self.entries[param_key].insert(0, dirname)
+                self.vars[param_key].set(dirname)
         else:
             filename = filedialog.asksaveasfilename(title="选择保存 文件", defaultextension=".csv", filetypes=[("CSV 文件", "*.csv"), ("所有文件", "*.*")])
             if filename:
-                self.entries[param_key].delete(0, tk.END)
-                self.entries[param_key].insert(0, filename)
+                self.vars[param_key].set(filename)
 
     def browse_file(self, param_key: str):
         filename = filedialog.askopenfilename(title="选择文件", filetypes=[("所有文件", "*.*")])
         if filename:
-            self.entries[param_key].delete(0, tk.END)
-            self.entries[param_key].insert(0, filename)
+            self.vars[param_key].set(filename)
 
     def set_dc_value(self):
         try:
@@ -1007,28 +1373,44 @@ class RinGUI:
 
     # 诊断连接（快速尝试连接，不会改变任何测量逻辑）
     def connect_instrument(self):
+        # 参数在主线程读取；连接可能阻塞数秒（系统超时），放到后台线程避免界面卡死
+        ip = self._param_cache["osa_ip"]
+        self.log("[连接] 正在尝试连接仪器...")
+        self.btn_connect.config(state=tk.DISABLED)
+        threading.Thread(target=self._connect_worker, args=(ip,), daemon=True).start()
+
+    def _connect_worker(self, ip: str):
         try:
-            self.log("[连接] 正在尝试连接仪器...")
             ra = RinAnalyzer(log_func=self.log)  # 临时创建一个测试连接实例
-            ip = self.entries["osa_ip"].get().strip()
             port = 5025
             success = ra.connect(ip, port)
             if success:
                 self.log("[连接] 成功连接到 FSV3004 频谱仪。")
+                ra.close()
             else:
                 self.log("[连接] 无法连接仪器，请检查地址或网络。")
         except Exception as e:
             self.log(f"[连接] 失败: {e}")
+        finally:
+            try:
+                # 测试期间若已启动任务，按钮保持由任务控制
+                self.root.after(0, lambda: self.running_task or self.btn_connect.config(state=tk.NORMAL))
+            except Exception:
+                pass
 
-    # 开始 RIN（线程）
-    def start_rin(self):
-        if self.running_task:
-            messagebox.showwarning("警告", "已有任务在运行")
-            return
+    # 任务类型 -> (日志名称, 分析器构造方法, TestRunner 方法, 额外参数)
+    _TASKS = {
+        "rin": ("RIN", "_make_rin_analyzer", "run_rin", ()),
+        "bg": ("底噪", "_make_bg_analyzer", "run_background", (False,)),
+        # 种子光功能与底噪相同，仅文件名不同
+        "seed": ("种子光", "_make_bg_analyzer", "run_background", (True,)),
+    }
+
+    def _make_rin_analyzer(self) -> RinAnalyzer:
         p = self.get_params()
-        # DC 值在主线程弹窗输入（保留原行为）
+        # DC 值在主线程读取（保留原行为）
         try:
-            dc_input = float(self.entries["dc_value"].get())
+            dc_input = float(self._param_cache["dc_value"])
             dc_for_ra = dc_input / 2.0
             self.log(f"[参数] DC 输入值 = {dc_input:.2f}，内部使用值 = {dc_for_ra:.2f}")
         except Exception:
@@ -1045,102 +1427,50 @@ class RinGUI:
             ra.save_path = None
         ra.ui_root = self.root
         ra.stop_flag = False
+        return ra
 
-        # run in background thread using TestRunner
-        def target():
-            try:
-                self.running_task = "rin"
-                self.btn_rin.config(state=tk.DISABLED)
-                self.btn_bg.config(state=tk.DISABLED)
-                self.btn_connect.config(state=tk.DISABLED)
-                self.btn_stop.config(state=tk.NORMAL)
-                self.runner._stop = False
-                self.runner.run_rin(ra, self.root)
-            except Exception as e:
-                self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
-            finally:
-                try:
-                    self.btn_rin.config(state=tk.NORMAL)
-                    self.btn_bg.config(state=tk.NORMAL)
-                    self.btn_connect.config(state=tk.NORMAL)
-                    self.btn_stop.config(state=tk.DISABLED)
-                except Exception:
-                    pass
-                self.running_task = None
-
-        self.worker_thread = threading.Thread(target=target, daemon=True)
-        self.worker_thread.start()
-        self.log("[主] RIN 测试线程已启动")
+    def _make_bg_analyzer(self) -> BackgroundNoiseAnalyzer:
+        return BackgroundNoiseAnalyzer(log_func=self.log)
 
-    # 开始底噪（线程）
-    def start_background(self):
+    def _start_task(self, kind: str):
+        """在主线程准备分析器并切换按钮，测量流程交给后台线程执行"""
         if self.running_task:
             messagebox.showwarning("警告", "已有任务在运行")
             return
-        p = self.get_params()
-        bna = BackgroundNoiseAnalyzer(log_func=self.log)
+        name, factory, method, extra = self._TASKS[kind]
+        analyzer = getattr(self, factory)()
+        run = getattr(self.runner, method)
 
-        def target_bg():
+        def target():
             try:
-                self.running_task = "bg"
-                self.btn_rin.config(state=tk.DISABLED)
-                self.btn_bg.config(state=tk.DISABLED)
-                self.btn_seed.config(state=tk.DISABLED)
-                self.btn_connect.config(state=tk.DISABLED)
-                self.btn_stop.config(state=tk.NORMAL)
                 self.runner._stop = False
-                self.runner.run_background(bna, self.root, is_seedlight=False)
+                run(analyzer, self.root, *extra)
             except Exception as e:
                 self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
             finally:
                 try:
-                    self.btn_rin.config(state=tk.NORMAL)
-                    self.btn_bg.config(state=tk.NORMAL)
-                    self.btn_seed.config(state=tk.NORMAL)
-                    self.btn_connect.config(state=tk.NORMAL)
-                    self.btn_stop.config(state=tk.DISABLED)
+                    self.root.after(0, self._set_buttons, False)
                 except Exception:
                     pass
                 self.running_task = None
 
-        self.worker_thread = threading.Thread(target=target_bg, daemon=True)
+        self.running_task = kind
+        self._set_buttons(True)
+        self.worker_thread = threading.Thread(target=target, daemon=True)
         self.worker_thread.start()
-        self.log("[主] 底噪测试线程已启动")
-    
-    # 开始种子光（线程）- 功能与底噪相同但使用不同的文件名
-    def start_seedlight(self):
-        if self.running_task:
-            messagebox.showwarning("警告", "已有任务在运行")
-            return
-        p = self.get_params()
-        bna = BackgroundNoiseAnalyzer(log_func=self.log)
+        self.log(f"[主] {name} 测试线程已启动")
 
-        def target_seed():
-            try:
-                self.running_task = "seed"
-                self.btn_rin.config(state=tk.DISABLED)
-                self.btn_bg.config(state=tk.DISABLED)
-                self.btn_seed.config(state=tk.DISABLED)
-                self.btn_connect.config(state=tk.DISABLED)
-                self.btn_stop.config(state=tk.NORMAL)
-                self.runner._stop = False
-                self.runner.run_background(bna, self.root, is_seedlight=True)
-            except Exception as e:
-                self.log(f"[线程异常] {e}\n{traceback.format_exc()}")
-            finally:
-                try:
-                    self.btn_rin.config(state=tk.NORMAL)
-                    self.btn_bg.config(state=tk.NORMAL)
-                    self.btn_seed.config(state=tk.NORMAL)
-                    self.btn_connect.config(state=tk.NORMAL)
-                    self.btn_stop.config(state=tk.DISABLED)
-                except Exception:
-                    pass
-                self.running_task = None
+    # 开始 RIN（线程）
+    def start_rin(self):
+        self._start_task("rin")
 
-        self.worker_thread = threading.Thread(target=target_seed, daemon=True)
-        self.worker_thread.start()
-        self.log("[主] 种子光测试线程已启动")
+    # 开始底噪（线程）
+    def start_background(self):
+        self._start_task("bg")
+
+    # 开始种子光（线程）
+    def start_seedlight(self):
+        self._start_task("seed")
 
     def stop_running(self):
         # 通知 runner 停止
@@ -1165,29 +1495,38 @@ class RinGUI:
                 messagebox.showerror("错误", f"保存目录不存在: {save_dir}")
                 return
 
+            # 一次 scandir 取全目录项（自带文件类型），改名过程中不再逐个 stat
+            with os.scandir(save_dir) as it:
+                entries = list(it)
+            # 目标名是否已存在直接查目录快照（不区分大小写，与 Windows 一致）
+            existing = {e.name.lower() for e in entries}
+
             renamed = []
-            for fname in os.listdir(save_dir):
-                low = fname.lower()
-                src = os.path.join(save_dir, fname)
-                if not os.path.isfile(src):
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
                     continue
+                fname = entry.name
+                low = fname.lower()
                 base_cn = None
-                # 匹配包含关键字的文件
-                if 'backgroundnoise' in low or 'background' in low:
-                    base_cn = '底噪'
-                elif 'seedlight' in low or 'seed' in low:
-                    base_cn = '种子光'
+                # 匹配包含关键字的文件（'background' / 'seed' 已涵盖完整关键字）
+                for kw, cn in self._RENAME_KEYWORDS:
+                    if kw in low:
+                        base_cn = cn
+                        break
                 if base_cn is None:
                     continue
 
+                src = entry.path
                 _, ext = os.path.splitext(fname)
                 target_name = f"{base_cn}{ext}"
-                dst = os.path.join(save_dir, target_name)
-                if os.path.exists(dst):
+                if target_name.lower() in existing:
                     ts = time.strftime("%Y%m%d_%H%M%S")
-                    dst = os.path.join(save_dir, f"{base_cn}_{ts}{ext}")
+                    target_name = f"{base_cn}_{ts}{ext}"
+                dst = os.path.join(save_dir, target_name)
                 try:
                     os.rename(src, dst)
+                    existing.discard(low)
+                    existing.add(target_name.lower())
                     renamed.append((src, dst))
                     self.log(f"[改名] {src} -> {dst}")
                 except Exception as e:
@@ -1198,6 +1537,7 @@ class RinGUI:
     def run(self):
         if self.root.winfo_exists():
             self.root.mainloop()
+        _close_rm()
 
 # -------------------------
 # Entry point